@@ -0,0 +1,103 @@
+"""
+Подбор параметров хеширования паролей под целевое время одного хеша
+на текущем оборудовании.
+
+    python -m app.cli.calibrate_hash --scheme bcrypt --target-ms 250
+    python -m app.cli.calibrate_hash --scheme argon2 --target-ms 250 --memory-cost 65536
+
+Выводит значения переменных окружения для найденных параметров.
+"""
+import argparse
+import secrets
+import statistics
+import sys
+import time
+from typing import Callable, Tuple
+
+from passlib.hash import argon2, bcrypt
+
+from app.core.config import settings
+
+
+def _measure(hash_func: Callable[[str], str], samples: int) -> float:
+    """Медианное время одного хеша в миллисекундах."""
+    password = secrets.token_urlsafe(16)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hash_func(password)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> Tuple[dict, float]:
+    """
+    Максимальное число раундов bcrypt, укладывающееся в целевое время.
+    Если даже минимум не укладывается, возвращается минимум с его измеренным временем.
+    """
+    best_rounds, best_ms = 4, None
+    for rounds in range(4, 32):
+        elapsed = _measure(bcrypt.using(rounds=rounds).hash, samples)
+        print(f"bcrypt rounds={rounds}: {elapsed:.1f} ms")
+        if best_ms is None:
+            best_ms = elapsed
+        if elapsed > target_ms:
+            break
+        best_rounds, best_ms = rounds, elapsed
+    return {"PASSWORD_HASH_ROUNDS": best_rounds}, best_ms
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_cost: int, parallelism: int) -> Tuple[dict, float]:
+    """
+    Максимальный time_cost argon2id при заданной памяти, укладывающийся в целевое время.
+    Если даже минимум не укладывается, возвращается минимум с его измеренным временем.
+    """
+    best_time_cost, best_ms = 1, None
+    for time_cost in range(1, 64):
+        handler = argon2.using(
+            type="ID",
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism
+        )
+        elapsed = _measure(handler.hash, samples)
+        print(f"argon2id time_cost={time_cost} memory_cost={memory_cost}: {elapsed:.1f} ms")
+        if best_ms is None:
+            best_ms = elapsed
+        if elapsed > target_ms:
+            break
+        best_time_cost, best_ms = time_cost, elapsed
+    return {
+        "ARGON2_TIME_COST": best_time_cost,
+        "ARGON2_MEMORY_COST": memory_cost,
+        "ARGON2_PARALLELISM": parallelism,
+    }, best_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEMES[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--memory-cost", type=int, default=settings.ARGON2_MEMORY_COST)
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    args = parser.parse_args()
+
+    if args.scheme == "bcrypt":
+        params, elapsed = calibrate_bcrypt(args.target_ms, args.samples)
+    else:
+        params, elapsed = calibrate_argon2(args.target_ms, args.samples, args.memory_cost, args.parallelism)
+
+    print(f"\n# {args.scheme}: ~{elapsed:.1f} ms per hash (target {args.target_ms:.0f} ms)")
+    if elapsed > args.target_ms:
+        print(
+            f"# WARNING: the minimum cost already takes {elapsed:.1f} ms, the target cannot be met on this hardware "
+            "(for argon2 try a lower --memory-cost)",
+            file=sys.stderr
+        )
+    for name, value in params.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
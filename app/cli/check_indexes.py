@@ -0,0 +1,137 @@
+"""
+Создание объявленных индексов и проверка планов запросов поиска и
+постраничного вывода через explain(): каждый запрос должен читать данные
+через ожидаемый индекс (IXSCAN), получать порядок страницы из индекса
+(без стадии SORT) и не просматривать документов намного больше, чем возвращает.
+
+    python -m app.cli.check_indexes
+    python -m app.cli.check_indexes --prefix adm --max-examined-ratio 5
+
+Код возврата 1, если хотя бы один план не использует ожидаемый индекс,
+содержит COLLSCAN или SORT, или totalDocsExamined превышает nReturned * --max-examined-ratio.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from pymongo import ASCENDING
+
+from app.core.config import settings
+from app.core.database import create_mongo_client
+from app.core.indexes import ensure_indexes
+from app.crud.user import SEARCH_INDEXES, build_search_filter, search_cursor, search_phases, user_projection
+from app.models.user import UserRole
+
+
+def _stages(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Все стадии плана запроса (включая вложенные)."""
+    yield plan
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    # Планы движка slot-based execution
+    if "queryPlan" in plan:
+        yield from _stages(plan["queryPlan"])
+
+
+def _check_plan(explain: Dict[str, Any], expected: Set[str], max_ratio: float) -> Dict[str, Any]:
+    """Проверка выигравшего плана: индексы IXSCAN, отсутствие COLLSCAN и SORT, число просмотренных документов."""
+    stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+    indexes = {stage["indexName"] for stage in stages if stage.get("stage") == "IXSCAN"}
+    stage_names = {stage.get("stage") for stage in stages}
+    # explain() без параметров выполняется с verbosity allPlansExecution и содержит executionStats
+    stats = explain["executionStats"]
+    examined = stats["totalDocsExamined"]
+    returned = stats["nReturned"]
+    errors = []
+    for stage in ("COLLSCAN", "SORT"):
+        if stage in stage_names:
+            errors.append(stage)
+    if indexes != expected:
+        errors.append(f"expected IXSCAN on {sorted(expected)}")
+    if examined > max(returned, 1) * max_ratio:
+        errors.append(f"examined {examined} documents for {returned} returned")
+    return {
+        "indexes": sorted(indexes),
+        "docs_examined": examined,
+        "returned": returned,
+        "errors": errors,
+    }
+
+
+def search_samples(prefix: str) -> Dict[str, Tuple[Dict[str, Any], List[str]]]:
+    """
+    Типичные запросы поиска администратора и индексы, которые должны использовать
+    запросы search_phases (q выполняется тремя запросами, остальные - одним).
+    """
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    return {
+        "q": (
+            build_search_filter(q=prefix),
+            [SEARCH_INDEXES["username"], SEARCH_INDEXES["email"], SEARCH_INDEXES["full_name"]]
+        ),
+        "username": (build_search_filter(username=prefix), [SEARCH_INDEXES["username"]]),
+        "email": (build_search_filter(email=prefix), [SEARCH_INDEXES["email"]]),
+        "full_name": (build_search_filter(full_name=prefix), [SEARCH_INDEXES["full_name"]]),
+        "username_active": (build_search_filter(username=prefix, is_active=True), [SEARCH_INDEXES["username"]]),
+        "role": (build_search_filter(role=UserRole.ADMIN), ["role_1__id_1"]),
+        "active": (build_search_filter(is_active=False), ["is_active_1_created_at_1__id_1"]),
+        "created_range": (
+            build_search_filter(created_from=week_ago, created_to=now),
+            ["created_at_1__id_1"]
+        ),
+        "active_created_range": (
+            build_search_filter(is_active=False, created_from=week_ago, created_to=now),
+            ["is_active_1_created_at_1__id_1"]
+        ),
+    }
+
+
+async def run(prefix: str, max_ratio: float) -> List[Dict[str, Any]]:
+    client = create_mongo_client()
+    try:
+        db = client[settings.MONGODB_DB_NAME]
+        await ensure_indexes(db)
+        results = []
+        for name, (filter_query, expected) in search_samples(prefix).items():
+            for phase, index in zip(search_phases(filter_query), expected):
+                explain = await search_cursor(db.users, phase, 101).explain()
+                results.append({"query": f"search:{name}:{index}", **_check_plan(explain, {index}, max_ratio)})
+
+        # Постраничный вывод списка с фильтром по роли (get_users_page)
+        explain = await (
+            db.users.find({"role": UserRole.USER.value}, user_projection())
+            .sort("_id", ASCENDING)
+            .limit(101)
+            .explain()
+        )
+        results.append({"query": "list:role", **_check_plan(explain, {"role_1__id_1"}, max_ratio)})
+        return results
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", default="adm")
+    parser.add_argument(
+        "--max-examined-ratio", type=float, default=10.0,
+        help="Допустимое отношение totalDocsExamined к nReturned"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.prefix, args.max_examined_ratio))
+    failed = False
+    for result in results:
+        failed = failed or bool(result["errors"])
+        print(json.dumps(result))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
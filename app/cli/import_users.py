@@ -0,0 +1,67 @@
+"""
+Массовый импорт пользователей из файла NDJSON или CSV напрямую в MongoDB.
+
+    python -m app.cli.import_users users.ndjson
+    python -m app.cli.import_users users.csv --format csv --chunk-size 2000 --results results.ndjson
+
+Пароли хешируются параллельно на всех ядрах, вставка выполняется пачками
+через неупорядоченный insert_many. В конце выводится сводка и скорость (строк/с).
+"""
+import argparse
+import asyncio
+import json
+from typing import AsyncIterator
+
+from app.core.bulk_import import import_users, iter_lines, parse_csv, parse_ndjson
+from app.core.config import settings
+from app.core.database import create_mongo_client
+from app.core.hashing import hashing_pool
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def run(path: str, file_format: str, chunk_size: int, results_path: str) -> None:
+    client = create_mongo_client()
+    try:
+        lines = iter_lines(_read_file(path))
+        rows = parse_csv(lines) if file_format == "csv" else parse_ndjson(lines)
+        summary = await import_users(client[settings.MONGODB_DB_NAME], rows, chunk_size)
+    finally:
+        client.close()
+        hashing_pool.shutdown()
+
+    results = summary.pop("results")
+    if results_path:
+        with open(results_path, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    else:
+        for result in results:
+            if result["status"] == "error":
+                print(json.dumps(result))
+    print(json.dumps(summary))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--results", default="", help="файл для результатов по каждой строке (NDJSON)")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    asyncio.run(run(args.path, file_format, args.chunk_size, args.results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Пересоздание индексов, параметры которых отличаются от объявленных
+в app/core/indexes.py (при старте приложения такие индексы не трогаются).
+
+    python -m app.cli.migrate_indexes --dry-run
+    python -m app.cli.migrate_indexes
+
+Запускается одним процессом при остановленной записи: пока уникальный индекс
+email/username пересоздается, ограничение уникальности не действует.
+Если за это время появились дубликаты, создание индекса завершится ошибкой.
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.database import create_mongo_client
+from app.core.indexes import changed_indexes, ensure_indexes
+
+
+async def run(dry_run: bool) -> Dict[str, List[str]]:
+    client = create_mongo_client()
+    try:
+        db = client[settings.MONGODB_DB_NAME]
+        if dry_run:
+            return await changed_indexes(db)
+        return await ensure_indexes(db, rebuild=True)
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Только показать отличающиеся индексы")
+    args = parser.parse_args()
+
+    changed = asyncio.run(run(args.dry_run))
+    print(json.dumps({"dry_run": args.dry_run, "changed": changed}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import csv
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+
+from app.crud.user import bulk_create_users
+from app.models.user import UserCreate
+
+# Строка входных данных: номер строки и разобранные поля либо ошибка разбора
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Максимальный размер одной записи CSV: незакрытая кавычка не должна накапливать весь файл
+MAX_CSV_RECORD_SIZE = 64 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Разбиение потока байтов на строки без чтения всего потока в память."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """Разбор NDJSON: один JSON объект на строку."""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Invalid JSON: object expected"
+            continue
+        yield row, data, None
+
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Записи CSV из потока строк: строки накапливаются, пока в записи не закрыты
+    все кавычки (поле в кавычках может содержать перевод строки), затем запись
+    разбирается csv.reader. Возвращает значения записи либо ошибку разбора.
+    """
+    pending: List[str] = []
+    pending_size = quotes = 0
+    async for line in lines:
+        if not pending and not line.strip():
+            continue
+        pending.append(line + "\n")
+        pending_size += len(line)
+        # Кавычки внутри поля удваиваются, поэтому запись закончена при четном их числе
+        quotes += line.count('"')
+        if quotes % 2:
+            if pending_size > MAX_CSV_RECORD_SIZE:
+                yield None, "Unterminated quoted field"
+                pending, pending_size, quotes = [], 0, 0
+            continue
+        try:
+            yield next(csv.reader(pending)), None
+        except csv.Error as e:
+            yield None, f"Invalid CSV: {e}"
+        pending, pending_size, quotes = [], 0, 0
+    if pending:
+        yield None, "Unterminated quoted field"
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """Разбор CSV с заголовком (username,email,password,full_name,role)."""
+    header: Optional[List[str]] = None
+    row = 0
+    async for values, error in _iter_csv_records(lines):
+        if header is None:
+            if error is not None:
+                row += 1
+                yield row, None, error
+                return
+            header = [value.strip() for value in values]
+            continue
+        row += 1
+        if error is not None:
+            yield row, None, error
+            continue
+        if len(values) > len(header):
+            yield row, None, "Too many columns"
+            continue
+        # Пустые значения не передаются, чтобы сработали значения по умолчанию модели
+        data = {key: value for key, value in zip(header, values) if value != ""}
+        yield row, data, None
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def import_users(
+    db: AsyncIOMotorDatabase,
+    rows: AsyncIterator[ParsedRow],
+    chunk_size: int = 1000
+) -> Dict[str, Any]:
+    """
+    Массовый импорт пользователей: валидация UserCreate, вставка пачками
+    через bulk_create_users. Возвращает сводку и результат по каждой строке.
+    """
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, UserCreate]] = []
+
+    async def flush() -> None:
+        created = await bulk_create_users(db, [user for _, user in pending])
+        for (row, _), result in zip(pending, created):
+            if "id" in result:
+                results.append({"row": row, "status": "created", "id": result["id"]})
+            else:
+                results.append({"row": row, "status": "error", "error": result["error"]})
+        pending.clear()
+
+    async for row, data, error in rows:
+        if error is None:
+            try:
+                pending.append((row, UserCreate(**data)))
+            except ValidationError as e:
+                error = _validation_message(e)
+        if error is not None:
+            results.append({"row": row, "status": "error", "error": error})
+        if len(pending) >= chunk_size:
+            await flush()
+    if pending:
+        await flush()
+
+    results.sort(key=lambda result: result["row"])
+    elapsed = time.perf_counter() - started
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "total": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(results) / elapsed, 1) if elapsed > 0 else 0.0,
+        "results": results,
+    }
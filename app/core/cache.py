@@ -0,0 +1,176 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Отметка поколения кэша: (номер последней инвалидации, время снятия отметки)
+Generation = Tuple[int, float]
+
+
+class LRUTTLCache:
+    """
+    Ограниченный по размеру кэш с вытеснением LRU и временем жизни записей.
+
+    Кэш живет внутри процесса и не является потокобезопасным: он
+    предназначен для использования из event loop.
+
+    Значение, прочитанное из источника до инвалидации ключа, не должно попасть
+    в кэш после нее: перед чтением снимается отметка generation(), и set()
+    с этой отметкой ничего не сохраняет, если ключ с тех пор инвалидирован.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_sets = 0
+        self._clock = 0
+        self._cleared_at = 0
+        # Недавние инвалидации (номер, время) в порядке появления; хранятся ttl секунд
+        self._invalidated: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+        self._listeners: List[Callable[[Optional[Hashable]], None]] = []
+
+    def on_invalidate(self, callback: Callable[[Optional[Hashable]], None]) -> None:
+        """Обработчик инвалидации: вызывается с ключом, а при clear() - с None."""
+        self._listeners.append(callback)
+
+    def generation(self) -> Generation:
+        """Отметка перед чтением значения из источника (для set(..., generation=...))."""
+        return self._clock, time.monotonic()
+
+    def _invalidated_since(self, key: Hashable, generation: Generation) -> bool:
+        clock, taken_at = generation
+        # Инвалидации старше ttl уже забыты - такую отметку считаем устаревшей
+        if time.monotonic() - taken_at > self.ttl or self._cleared_at > clock:
+            return True
+        item = self._invalidated.get(key)
+        return item is not None and item[0] > clock
+
+    def _mark_invalidated(self, key: Hashable, now: float) -> None:
+        self._clock += 1
+        self._invalidated[key] = (self._clock, now)
+        self._invalidated.move_to_end(key)
+
+    def _prune_invalidated(self, now: float) -> None:
+        while self._invalidated:
+            key, (_, invalidated_at) = next(iter(self._invalidated.items()))
+            if now - invalidated_at <= self.ttl:
+                break
+            del self._invalidated[key]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получение значения; просроченные записи удаляются."""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[Generation] = None
+    ) -> None:
+        """
+        Сохранение значения; ttl переопределяет время жизни по умолчанию.
+        generation - отметка, снятая до чтения value: если ключ с тех пор
+        инвалидирован, значение устарело и не сохраняется.
+        """
+        if self.maxsize <= 0:
+            return
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+        if generation is not None and self._invalidated_since(key, generation):
+            self.stale_sets += 1
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаление записи из кэша."""
+        self.invalidate_many((key,))
+
+    def invalidate_many(self, keys: Iterable[Hashable]) -> None:
+        """Удаление нескольких записей за один проход."""
+        now = time.monotonic()
+        for key in keys:
+            self._data.pop(key, None)
+            self._mark_invalidated(key, now)
+            for callback in self._listeners:
+                callback(key)
+        self._prune_invalidated(now)
+
+    def clear(self) -> None:
+        """Полная очистка кэша."""
+        self._data.clear()
+        self._clock += 1
+        self._cleared_at = self._clock
+        self._invalidated.clear()
+        for callback in self._listeners:
+            callback(None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_sets": self.stale_sets,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+
+# Кэш пользователей для get_current_user (ключ - ID пользователя)
+principal_cache = LRUTTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# Кэш уже проверенных JWT токенов (ключ - дайджест токена)
+token_cache = LRUTTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+)
+
+
+# Кэш отсутствующих пользователей для входа (ключ - ("email"|"username", значение))
+negative_cache = LRUTTLCache(
+    maxsize=settings.NEGATIVE_CACHE_SIZE,
+    ttl=settings.NEGATIVE_CACHE_TTL_SECONDS,
+)
+
+
+# Кэш статистики пользователей (ключ - параметры запроса статистики)
+user_stats_cache = LRUTTLCache(
+    maxsize=64,
+    ttl=settings.USER_STATS_CACHE_TTL_SECONDS,
+)
@@ -1,11 +1,17 @@
+import importlib.util
 import os
+import socket
 from datetime import timedelta
-from typing import Optional
+from typing import Dict, Literal, Optional
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Поддерживаемые драйвером алгоритмы сжатия и модули, которые им нужны
+_COMPRESSOR_MODULES = {"zlib": None, "zstd": "zstandard", "snappy": "snappy"}
+
 
 class Settings(BaseSettings):
     APP_NAME: str = "Auth API"
@@ -13,18 +19,104 @@ class Settings(BaseSettings):
     
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-jwt-please-change-in-production")
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # HS256, RS256, ES256 или EdDSA
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWKS_CACHE_MAX_AGE_SECONDS: int = 300
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    
+    # Stateless Auth Settings
+    AUTH_STATELESS: bool = False
+    AUTH_STATELESS_MAX_TOKEN_AGE_SECONDS: int = 300
+    AUTH_STATELESS_REVOCATION_CHECK: bool = True
+    
+    # Token Introspection Settings
+    INTROSPECTION_CLIENTS: Dict[str, str] = {}  # client_id -> secret (HTTP Basic)
+    INTROSPECTION_CACHE_MAX_AGE_SECONDS: int = 30
+    INTROSPECTION_BATCH_MAX_TOKENS: int = 100
     
     # MongoDB Settings
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "auth_db")
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_COMPRESSORS: str = "zlib"  # через запятую: zlib, zstd, snappy; пустая строка - без сжатия
+    MONGODB_READ_PREFERENCE: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"  # для чтений, не требующих актуальности
+    READINESS_TIMEOUT_SECONDS: float = 2.0
     
     # CORS Settings
     CORS_ORIGINS: list = ["*"]
     
     # Security Settings
+    PASSWORD_HASH_SCHEMES: list = ["bcrypt"]  # bcrypt и/или argon2, первая - для новых хешей
     PASSWORD_HASH_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # КиБ
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+    
+    # Hashing Pool Settings
+    HASH_POOL_SIZE: int = os.cpu_count() or 1
+    HASH_POOL_QUEUE_DEPTH: int = 64
+    HASH_POOL_RETRY_AFTER_SECONDS: int = 1
+    
+    # Login Rate Limit Settings
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["mongodb", "redis", "memory"] = "mongodb"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    LOGIN_RATE_LIMIT_PER_IP: int = 30
+    LOGIN_RATE_LIMIT_PER_USERNAME: int = 10
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    
+    # Background Scheduler Settings
+    SCHEDULER_WORKERS: int = 4
+    SCHEDULER_QUEUE_SIZE: int = 10000
+    SCHEDULER_DRAIN_TIMEOUT_SECONDS: float = 10.0
+    DEFERRED_WRITE_BATCH_SIZE: int = 500
+    DEFERRED_WRITE_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SESSION_PURGE_INTERVAL_SECONDS: int = 3600
+    AUDIT_LOG_RETENTION_DAYS: int = 90
+    
+    # Cache Coherence Settings
+    CACHE_WATCH_MODE: str = "auto"  # auto, change_stream, polling или off
+    CACHE_POLL_INTERVAL_SECONDS: float = 2.0
+    CACHE_WATCH_CHECKPOINT_SECONDS: float = 10.0
+    CACHE_WATCHER_ID: str = socket.gethostname()  # resume token общий для коллекции, процессы могут делить ID
+    
+    # Principal Cache Settings
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Verified Token Cache Settings
+    TOKEN_CACHE_SIZE: int = 50000
+    TOKEN_CACHE_TTL_SECONDS: int = 600
+    
+    # User Statistics Settings
+    USER_STATS_CACHE_TTL_SECONDS: int = 30
+    
+    # Negative Lookup Cache Settings
+    NEGATIVE_CACHE_SIZE: int = 100000
+    NEGATIVE_CACHE_TTL_SECONDS: int = 300
+    
+    @field_validator("MONGODB_COMPRESSORS")
+    @classmethod
+    def validate_compressors(cls, value: str) -> str:
+        """zstd и snappy требуют необязательных пакетов (requirements-compression.txt)."""
+        for compressor in filter(None, (item.strip() for item in value.split(","))):
+            if compressor not in _COMPRESSOR_MODULES:
+                raise ValueError(f"Unknown MongoDB compressor: {compressor}")
+            module = _COMPRESSOR_MODULES[compressor]
+            if module and importlib.util.find_spec(module) is None:
+                raise ValueError(f"MongoDB compressor {compressor} requires the '{module}' package")
+        return value
     
     class Config:
         env_file = ".env"
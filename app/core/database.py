@@ -0,0 +1,132 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.read_preferences import ReadPreference
+
+from app.core.config import settings
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Счетчики пулов соединений MongoDB по событиям CMAP драйвера:
+    занятые и открытые соединения, ожидающие выдачи соединения запросы.
+    События приходят из потоков драйвера, поэтому счетчики защищены блокировкой.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._max_size: Dict[str, int] = {}
+        self._in_use: Dict[str, int] = defaultdict(int)
+        self._open: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._checkout_failures: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _key(event: Any) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._max_size[self._key(event)] = event.options.get("maxPoolSize", settings.MONGODB_MAX_POOL_SIZE)
+
+    def pool_ready(self, event: Any) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        key = self._key(event)
+        with self._lock:
+            for counters in (self._max_size, self._in_use, self._open, self._waiting, self._checkout_failures):
+                counters.pop(key, None)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._open[self._key(event)] += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._open[self._key(event)] -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        with self._lock:
+            self._waiting[self._key(event)] += 1
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        key = self._key(event)
+        with self._lock:
+            self._waiting[key] -= 1
+            self._checkout_failures[key] += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        key = self._key(event)
+        with self._lock:
+            self._waiting[key] -= 1
+            self._in_use[key] += 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._in_use[self._key(event)] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние пулов по адресам серверов."""
+        with self._lock:
+            result = {}
+            for key, max_size in self._max_size.items():
+                in_use = self._in_use[key]
+                result[key] = {
+                    "max_size": max_size,
+                    "open": self._open[key],
+                    "in_use": in_use,
+                    "waiting": self._waiting[key],
+                    "checkout_failures": self._checkout_failures[key],
+                    "saturation": (in_use / max_size) if max_size else 0.0,
+                }
+            return result
+
+
+pool_monitor = PoolMonitor()
+
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    """Создание клиента MongoDB с настройками пула, таймаутов и сжатия."""
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "appname": settings.APP_NAME,
+        "event_listeners": [pool_monitor],
+    }
+    if settings.MONGODB_COMPRESSORS:
+        options["compressors"] = settings.MONGODB_COMPRESSORS
+    # Неуказанные значения оставляем драйверу
+    options = {key: value for key, value in options.items() if value is not None}
+    return AsyncIOMotorClient(settings.MONGODB_URL, **options)
+
+
+def read_database_from_client(client: AsyncIOMotorClient) -> AsyncIOMotorDatabase:
+    """База данных для чтения с настроенным read preference (например, secondaryPreferred)."""
+    return client.get_database(
+        settings.MONGODB_DB_NAME,
+        read_preference=READ_PREFERENCES[settings.MONGODB_READ_PREFERENCE]
+    )
@@ -1,31 +1,79 @@
-from typing import Annotated, Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import secrets
+import time
+from typing import Annotated, Any, Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBasic, HTTPBasicCredentials, OAuth2PasswordBearer
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from jose import JWTError
+from jwt import PyJWTError
 
+from app.core.config import settings
+from app.core.revocation import revocation_registry
 from app.core.security import decode_token
-from app.crud.user import get_user_by_id
+from app.crud.user import load_principal
 from app.models.user import User, UserRole, TokenData
 
 # Определение OAuth2 схемы с путем для получения токена
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Аутентификация сервисов, проверяющих токены через introspection
+introspection_scheme = HTTPBasic()
 
 
-async def get_database() -> AsyncIOMotorDatabase:
+async def get_database(request: Request) -> AsyncIOMotorDatabase:
     """Получение экземпляра базы данных."""
-    from main import app
-    return app.mongodb
+    return request.app.state.mongodb
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+async def get_read_database(request: Request) -> AsyncIOMotorDatabase:
+    """
+    Экземпляр базы данных для чтений, не требующих актуальности
+    (read preference из MONGODB_READ_PREFERENCE, например secondaryPreferred).
+    """
+    return request.app.state.mongodb_read
+
+
+def _principal_from_claims(token_data: TokenData) -> Optional[Dict[str, Any]]:
+    """
+    Восстановление пользователя из подписанных claims токена (stateless-режим).
+    Возвращает None, если токен слишком старый или в нем нет нужных полей.
+    """
+    if token_data.issued_at is None or token_data.created_at is None or token_data.updated_at is None:
+        return None
+    if time.time() - token_data.issued_at > settings.AUTH_STATELESS_MAX_TOKEN_AGE_SECONDS:
+        return None
+    
+    return {
+        "id": token_data.user_id,
+        "username": token_data.username,
+        "email": token_data.email,
+        "full_name": token_data.full_name,
+        "role": token_data.role,
+        "is_active": True,
+        "created_at": token_data.created_at,
+        "updated_at": token_data.updated_at,
+    }
+
+
+async def _resolve_current_user(
+    token: str,
+    db: AsyncIOMotorDatabase,
+    allow_stateless: bool
 ) -> User:
-    """Получение текущего аутентифицированного пользователя"""
+    """Проверка токена и получение пользователя (из claims, кэша или БД)"""
     try:
         token_data = decode_token(token)
-        user = await get_user_by_id(db, token_data.user_id)
+        
+        if allow_stateless:
+            if settings.AUTH_STATELESS_REVOCATION_CHECK and revocation_registry.is_revoked(token_data):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token revoked",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            principal = _principal_from_claims(token_data)
+            if principal is not None:
+                return principal
+        
+        user = await load_principal(db, token_data.user_id)
         
         if user is None:
             raise HTTPException(
@@ -41,9 +89,18 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
-        return user
+        # Токен выпущен до выхода на всех устройствах, смены пароля или роли
+        if token_data.token_version < user.get("token_version", 0):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+            
+        # Копия, чтобы обработчики не изменяли закэшированный объект
+        return dict(user)
         
-    except (JWTError, HTTPException) as e:
+    except (PyJWTError, HTTPException) as e:
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(
@@ -53,6 +110,17 @@ async def get_current_user(
         )
 
 
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+) -> User:
+    """
+    Получение текущего аутентифицированного пользователя.
+    При AUTH_STATELESS=True пользователь берется из claims токена без обращения к БД.
+    """
+    return await _resolve_current_user(token, db, settings.AUTH_STATELESS)
+
+
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
 ) -> User:
@@ -86,4 +154,23 @@ def optional_current_user(
     try:
         return get_current_user(token, db)
     except HTTPException:
-        return None 
\ No newline at end of file
+        return None 
+
+
+async def get_introspection_client(
+    credentials: Annotated[HTTPBasicCredentials, Depends(introspection_scheme)]
+) -> str:
+    """Проверка учетных данных клиента introspection (INTROSPECTION_CLIENTS)."""
+    secret = settings.INTROSPECTION_CLIENTS.get(credentials.username)
+    # Сравнение выполняется и для неизвестного клиента, чтобы время ответа не зависело от него
+    valid = secrets.compare_digest(
+        credentials.password.encode(),
+        (secret if secret is not None else secrets.token_urlsafe(16)).encode()
+    )
+    if secret is None or not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    return credentials.username
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.metrics import HASH_POOL_EXECUTION, HASH_POOL_QUEUE_WAIT, HASH_POOL_REJECTED
+
+
+class _Timing:
+    """Накопительная статистика длительностей (в секундах)."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "max_ms": self.max * 1000,
+        }
+
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> Tuple[Any, float, float]:
+    """Выполнение функции в рабочем потоке с замером времени начала и окончания."""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started, time.perf_counter()
+
+
+class HashingPool:
+    """
+    Выделенный пул потоков для bcrypt/argon2.
+
+    bcrypt отпускает GIL на время вычисления хеша, поэтому пул потоков
+    загружает все ядра и не блокирует event loop. Количество одновременно
+    принятых задач ограничено (size + queue_depth): при переполнении
+    запрос сразу получает 503 с заголовком Retry-After.
+    """
+
+    def __init__(self, size: int, queue_depth: int, retry_after: int) -> None:
+        self.size = size
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.queue_wait = _Timing()
+        self.hash_time = _Timing()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size,
+                thread_name_prefix="hashing"
+            )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size + self.queue_depth)
+        return self._slots
+
+    async def run(self, func: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """
+        Выполнение функции хеширования в пуле.
+        При wait=False и заполненной очереди возвращается 503.
+        """
+        slots = self._get_slots()
+        if slots.locked() and not wait:
+            self.rejected += 1
+            HASH_POOL_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        async with slots:
+            self.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                submitted = time.perf_counter()
+                result, started, finished = await loop.run_in_executor(
+                    self._get_executor(), _timed_call, func, *args
+                )
+            finally:
+                self.in_flight -= 1
+
+        self.queue_wait.observe(started - submitted)
+        self.hash_time.observe(finished - started)
+        HASH_POOL_QUEUE_WAIT.observe(started - submitted)
+        HASH_POOL_EXECUTION.observe(finished - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущее состояние пула и метрики ожидания/хеширования."""
+        return {
+            "size": self.size,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.as_dict(),
+            "hash_time": self.hash_time.as_dict(),
+        }
+
+    def shutdown(self) -> None:
+        """Остановка рабочих потоков."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._slots = None
+
+
+hashing_pool = HashingPool(
+    size=settings.HASH_POOL_SIZE,
+    queue_depth=settings.HASH_POOL_QUEUE_DEPTH,
+    retry_after=settings.HASH_POOL_RETRY_AFTER_SECONDS,
+)
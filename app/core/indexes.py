@@ -0,0 +1,149 @@
+import logging
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation, CollationStrength
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Регистронезависимое сравнение строк (поиск по префиксу без учета регистра)
+CASE_INSENSITIVE = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    """
+    Индексы всех коллекций. Недостающие создаются при старте; индекс с тем же именем,
+    но другими параметрами пересоздается только командой python -m app.cli.migrate_indexes.
+    """
+    return {
+        "users": [
+            IndexModel("email", unique=True, name="email_1"),
+            IndexModel("username", unique=True, name="username_1"),
+            # Постраничный вывод по курсору с фильтром по роли
+            IndexModel([("role", ASCENDING), ("_id", ASCENDING)], name="role_1__id_1"),
+            # Поиск по префиксу без учета регистра (запросы с той же collation);
+            # _id в ключе задает порядок страниц, сортировка выполняется по индексу
+            IndexModel(
+                [("username", ASCENDING), ("_id", ASCENDING)], collation=CASE_INSENSITIVE, name="username_1__id_1_ci"
+            ),
+            IndexModel(
+                [("email", ASCENDING), ("_id", ASCENDING)], collation=CASE_INSENSITIVE, name="email_1__id_1_ci"
+            ),
+            IndexModel(
+                [("full_name", ASCENDING), ("_id", ASCENDING)], collation=CASE_INSENSITIVE, name="full_name_1__id_1_ci"
+            ),
+            # Фильтры по активности и диапазону даты создания, порядок страниц (created_at, _id)
+            IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at_1__id_1"),
+            IndexModel(
+                [("is_active", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+                name="is_active_1_created_at_1__id_1"
+            ),
+            # Версии токенов, измененные за время жизни токена доступа
+            IndexModel("token_version_changed_at", sparse=True, name="token_version_changed_at_1"),
+            # Опрос изменений (без change streams)
+            IndexModel("updated_at", name="updated_at_1"),
+        ],
+        "user_tombstones": [
+            IndexModel(
+                "deleted_at",
+                expireAfterSeconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+                name="deleted_at_1"
+            ),
+        ],
+        "refresh_tokens": [
+            # Refresh токены удаляются MongoDB по истечении срока
+            IndexModel("expires_at", expireAfterSeconds=0, name="expires_at_1"),
+            IndexModel("family_id", name="family_id_1"),
+            IndexModel("user_id", name="user_id_1"),
+        ],
+        "sessions": [
+            IndexModel("expires_at", expireAfterSeconds=0, name="expires_at_1"),
+            IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_1__id_-1"),
+        ],
+        "revoked_tokens": [
+            IndexModel("expires_at", expireAfterSeconds=0, name="expires_at_1"),
+            # Опрос новых отзывов воркерами (user_change_watcher в режиме polling)
+            IndexModel("revoked_at", name="revoked_at_1"),
+        ],
+        "login_rate_limits": [
+            # Счетчики окон ограничения попыток входа (RATE_LIMIT_BACKEND=mongodb)
+            IndexModel("expires_at", expireAfterSeconds=0, name="expires_at_1"),
+        ],
+        "audit_log": [
+            # Журнал событий безопасности хранится AUDIT_LOG_RETENTION_DAYS
+            IndexModel(
+                "created_at",
+                expireAfterSeconds=settings.AUDIT_LOG_RETENTION_DAYS * 24 * 3600,
+                name="created_at_1"
+            ),
+        ],
+    }
+
+
+def _same_index(existing: Dict[str, Any], declared: Dict[str, Any]) -> bool:
+    """Совпадают ли ключи и параметры существующего индекса с объявленными."""
+    if list(existing["key"]) != list(declared["key"].items()):
+        return False
+    for option in ("unique", "sparse"):
+        if bool(existing.get(option)) != bool(declared.get(option)):
+            return False
+    if existing.get("expireAfterSeconds") != declared.get("expireAfterSeconds"):
+        return False
+    existing_collation = existing.get("collation") or {}
+    declared_collation = declared.get("collation") or {}
+    return all(
+        existing_collation.get(field) == declared_collation.get(field)
+        for field in ("locale", "strength")
+    )
+
+
+async def changed_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """Имена существующих индексов, параметры которых отличаются от объявленных, по коллекциям."""
+    changed: Dict[str, List[str]] = {}
+    for collection_name, models in declared_indexes().items():
+        existing = await db[collection_name].index_information()
+        for model in models:
+            current = existing.get(model.document["name"])
+            if current is not None and not _same_index(current, model.document):
+                changed.setdefault(collection_name, []).append(model.document["name"])
+    return changed
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, rebuild: bool = False) -> Dict[str, List[str]]:
+    """
+    Создание недостающих объявленных индексов.
+
+    Индексы с измененными параметрами при rebuild=False не трогаются, а только
+    попадают в лог: при старте воркеры выполняют эту функцию одновременно, а удаление
+    уникального индекса email/username до окончания перестроения допускает вставку дубликатов.
+    rebuild=True (migrate_indexes, один процесс) удаляет и создает их заново.
+
+    Возвращает имена отличающихся (при rebuild=True - пересозданных) индексов по коллекциям.
+    """
+    changed: Dict[str, List[str]] = {}
+    for collection_name, models in declared_indexes().items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        missing = []
+        for model in models:
+            declared = model.document
+            current = existing.get(declared["name"])
+            if current is None:
+                missing.append(model)
+            elif not _same_index(current, declared):
+                changed.setdefault(collection_name, []).append(declared["name"])
+                if rebuild:
+                    logger.info("Rebuilding index %s.%s", collection_name, declared["name"])
+                    await collection.drop_index(declared["name"])
+                    missing.append(model)
+                else:
+                    logger.warning(
+                        "Index %s.%s differs from declaration, run python -m app.cli.migrate_indexes",
+                        collection_name, declared["name"]
+                    )
+        if missing:
+            await collection.create_indexes(missing)
+    return changed
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from jwt.algorithms import get_default_algorithms
+
+from app.core.config import settings
+
+# Алгоритмы с симметричным ключом (SECRET_KEY)
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+
+PRIVATE_KEY_SUFFIX = ".pem"
+PUBLIC_KEY_SUFFIX = ".pub.pem"
+
+
+class KeyRing:
+    """
+    Набор ключей подписи JWT.
+
+    Для асимметричных алгоритмов (RS256, ES256, EdDSA) ключи читаются из
+    каталога JWT_KEYS_DIR: `<kid>.pem` - закрытый ключ, `<kid>.pub.pem` -
+    открытый ключ выведенного из оборота ключа (только для проверки).
+    Новые токены подписываются ключом JWT_ACTIVE_KID. Ключи разбираются
+    один раз и хранятся в виде готовых объектов, JWKS формируется заранее.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret: str,
+        keys_dir: Optional[str] = None,
+        active_kid: Optional[str] = None
+    ) -> None:
+        self.algorithm = algorithm
+        self.secret = secret
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self._signing_key: Any = None
+        self._verification_keys: Dict[str, Any] = {}
+        self._jwks: Dict[str, Any] = {"keys": []}
+        self._jwks_etag = ""
+        self._loaded = False
+
+    @property
+    def is_symmetric(self) -> bool:
+        return self.algorithm in SYMMETRIC_ALGORITHMS
+
+    def load(self) -> None:
+        """Чтение и разбор ключей (повторный вызов перечитывает каталог)."""
+        if self.is_symmetric:
+            self._signing_key = self.secret
+            self._verification_keys = {}
+            self._set_jwks([])
+            self._loaded = True
+            return
+
+        if not self.keys_dir or not self.active_kid:
+            raise RuntimeError(f"JWT_KEYS_DIR and JWT_ACTIVE_KID are required for {self.algorithm}")
+
+        signing_key = None
+        verification_keys = {}
+        for filename in sorted(os.listdir(self.keys_dir)):
+            path = os.path.join(self.keys_dir, filename)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            if filename.endswith(PUBLIC_KEY_SUFFIX):
+                kid = filename[:-len(PUBLIC_KEY_SUFFIX)]
+                verification_keys[kid] = serialization.load_pem_public_key(data)
+            elif filename.endswith(PRIVATE_KEY_SUFFIX):
+                kid = filename[:-len(PRIVATE_KEY_SUFFIX)]
+                private_key = serialization.load_pem_private_key(data, password=None)
+                verification_keys[kid] = private_key.public_key()
+                if kid == self.active_kid:
+                    signing_key = private_key
+
+        if signing_key is None:
+            raise RuntimeError(f"Private key for active kid '{self.active_kid}' not found in {self.keys_dir}")
+
+        algorithm = get_default_algorithms()[self.algorithm]
+        jwks = []
+        for kid, public_key in verification_keys.items():
+            jwk = json.loads(algorithm.to_jwk(public_key))
+            jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            jwks.append(jwk)
+
+        self._signing_key = signing_key
+        self._verification_keys = verification_keys
+        self._set_jwks(jwks)
+        self._loaded = True
+
+    def _set_jwks(self, keys: list) -> None:
+        self._jwks = {"keys": keys}
+        body = json.dumps(self._jwks, sort_keys=True).encode()
+        self._jwks_etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def signing_key(self) -> Tuple[Optional[str], Any]:
+        """Ключ для подписи новых токенов и его kid."""
+        if not self._loaded:
+            self.load()
+        return (None if self.is_symmetric else self.active_kid), self._signing_key
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Ключ для проверки подписи токена с заданным kid."""
+        if not self._loaded:
+            self.load()
+        if self.is_symmetric:
+            return self._signing_key
+        if kid is None:
+            return None
+        return self._verification_keys.get(kid)
+
+    def jwks(self) -> Tuple[Dict[str, Any], str]:
+        """Открытые ключи в формате JWKS и ETag для кэширования."""
+        if not self._loaded:
+            self.load()
+        return self._jwks, self._jwks_etag
+
+
+key_ring = KeyRing(
+    algorithm=settings.ALGORITHM,
+    secret=settings.SECRET_KEY,
+    keys_dir=settings.JWT_KEYS_DIR,
+    active_kid=settings.JWT_ACTIVE_KID,
+)
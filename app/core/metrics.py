@@ -0,0 +1,159 @@
+import asyncio
+import functools
+import os
+import time
+from typing import Any, Callable, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Границы корзин: от долей миллисекунды (JWT, кэш) до секунд (bcrypt под нагрузкой)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Password hashing/verification latency including queue wait",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+HASH_POOL_QUEUE_WAIT = Histogram(
+    "hash_pool_queue_wait_seconds",
+    "Time a hashing task waits for a worker thread",
+    buckets=LATENCY_BUCKETS,
+)
+HASH_POOL_EXECUTION = Histogram(
+    "hash_pool_execution_seconds",
+    "Time a hashing task runs on a worker thread",
+    buckets=LATENCY_BUCKETS,
+)
+HASH_POOL_REJECTED = Counter(
+    "hash_pool_rejected_total",
+    "Hashing tasks rejected because the queue was full",
+)
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds",
+    "JWT encode/decode latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_OPERATION_DURATION = Histogram(
+    "db_operation_duration_seconds",
+    "CRUD operation latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Background job latency",
+    ["job", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+SCHEDULER_DROPPED = Counter(
+    "scheduler_dropped_total",
+    "Background jobs and deferred writes dropped because the queue was full",
+    ["kind"],
+)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth",
+    "Pending background jobs and deferred writes",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+DEFERRED_WRITES = Counter(
+    "deferred_writes_total",
+    "Deferred MongoDB writes flushed via bulk_write",
+    ["collection", "status"],
+)
+
+
+def timed(histogram: Histogram, **labels: str) -> Callable:
+    """Декоратор: замер длительности вызова синхронной или асинхронной функции."""
+    metric = histogram.labels(**labels) if labels else histogram
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metric.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def is_multiprocess() -> bool:
+    """Режим нескольких процессов uvicorn: метрики пишутся в PROMETHEUS_MULTIPROC_DIR."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Метрики в текстовом формате Prometheus (агрегированные по всем процессам)."""
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Очистка файлов метрик завершившегося процесса."""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: гистограмма длительности запросов с меткой шаблона
+    маршрута (а не фактического пути, чтобы не раздувать число рядов).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - started)
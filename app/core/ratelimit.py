@@ -0,0 +1,217 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Проверяемые лимиты одной попытки: (ключ, лимит за окно)
+RateLimitChecks = List[Tuple[str, int]]
+
+
+def _sliding_estimate(previous: int, current: int, elapsed: float, window: int) -> float:
+    """Оценка числа попыток за последние window секунд по счетчикам двух окон."""
+    return previous * (1 - elapsed / window) + current
+
+
+class MemoryRateLimitBackend:
+    """
+    Ограничение частоты в памяти процесса (скользящее окно из двух счетчиков).
+    Лимиты действуют в пределах одного процесса uvicorn.
+    """
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        # ключ -> [номер окна, счетчик текущего окна, счетчик предыдущего окна]
+        self._windows: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        pass
+
+    def _state(self, key: str, index: int) -> List[int]:
+        state = self._windows.get(key)
+        if state is None or state[0] < index - 1:
+            state = [index, 0, 0]
+        elif state[0] == index - 1:
+            state = [index, 0, state[1]]
+        self._windows[key] = state
+        self._windows.move_to_end(key)
+        return state
+
+    async def hit(self, checks: RateLimitChecks, window: int) -> float:
+        """
+        Учет попытки по всем ключам. Счетчики увеличиваются, только если не превышен
+        ни один лимит. Возвращает 0, если попытка разрешена, иначе - через сколько секунд повторить.
+        """
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        states = [(self._state(key, index), limit) for key, limit in checks]
+        for state, limit in states:
+            if _sliding_estimate(state[2], state[1], elapsed, window) + 1 > limit:
+                return window - elapsed
+
+        for state, _ in states:
+            state[1] += 1
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+        return 0.0
+
+
+class MongoRateLimitBackend:
+    """
+    Ограничение частоты в MongoDB: счетчики окон в коллекции login_rate_limits
+    (удаляются TTL индексом), лимиты общие для всех процессов и экземпляров сервиса.
+    Проверка и увеличение счетчиков - два запроса, поэтому одновременные
+    попытки могут превысить лимит не больше чем на число одновременных запросов.
+    """
+
+    def __init__(self) -> None:
+        self._collection = None
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        self._collection = db.login_rate_limits
+
+    async def hit(self, checks: RateLimitChecks, window: int) -> float:
+        """
+        Учет попытки по всем ключам. Счетчики увеличиваются, только если не превышен
+        ни один лимит. Возвращает 0, если попытка разрешена, иначе - через сколько секунд повторить.
+        """
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        try:
+            ids = [f"{key}:{window_index}" for key, _ in checks for window_index in (index, index - 1)]
+            counts = {
+                document["_id"]: document["count"]
+                async for document in self._collection.find({"_id": {"$in": ids}})
+            }
+            for key, limit in checks:
+                previous = counts.get(f"{key}:{index - 1}", 0)
+                current = counts.get(f"{key}:{index}", 0)
+                if _sliding_estimate(previous, current, elapsed, window) + 1 > limit:
+                    return window - elapsed
+
+            # Счетчик нужен, пока окно остается текущим или предыдущим
+            expires_at = datetime.utcfromtimestamp((index + 2) * window)
+            await self._collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": f"{key}:{index}"},
+                        {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                        upsert=True
+                    )
+                    for key, _ in checks
+                ],
+                ordered=False
+            )
+        except PyMongoError:
+            # Недоступность хранилища лимитов не должна блокировать вход
+            logger.warning("Rate limit backend is unavailable", exc_info=True)
+        return 0.0
+
+
+# Тот же алгоритм, выполняемый атомарно на стороне Redis: сначала проверяются
+# все ключи, счетчики увеличиваются, только если ни один лимит не превышен
+_SLIDING_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local index = math.floor(now / window)
+local elapsed = now - index * window
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i + 2])
+    local curr = tonumber(redis.call('GET', key .. ':' .. index) or '0')
+    local prev = tonumber(redis.call('GET', key .. ':' .. (index - 1)) or '0')
+    if prev * (1 - elapsed / window) + curr + 1 > limit then
+        return tostring(window - elapsed)
+    end
+end
+for _, key in ipairs(KEYS) do
+    local curr_key = key .. ':' .. index
+    redis.call('INCR', curr_key)
+    redis.call('EXPIRE', curr_key, math.ceil(window * 2))
+end
+return '0'
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Ограничение частоты в Redis (или совместимом сервере): лимиты общие
+    для всех процессов uvicorn и всех экземпляров сервиса.
+    Требует пакет redis (requirements-redis.txt).
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit") -> None:
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (requirements-redis.txt)")
+
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        pass
+
+    async def hit(self, checks: RateLimitChecks, window: int) -> float:
+        """
+        Учет попытки по всем ключам. Счетчики увеличиваются, только если не превышен
+        ни один лимит. Возвращает 0, если попытка разрешена, иначе - через сколько секунд повторить.
+        """
+        try:
+            result = await self._script(
+                keys=[f"{self.prefix}:{key}" for key, _ in checks],
+                args=[window, time.time(), *(limit for _, limit in checks)]
+            )
+        except Exception:
+            # Недоступность Redis не должна блокировать вход
+            logger.warning("Rate limit backend is unavailable", exc_info=True)
+            return 0.0
+        return float(result)
+
+
+def _create_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    if settings.RATE_LIMIT_BACKEND == "mongodb":
+        return MongoRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+rate_limit_backend = _create_backend()
+
+
+async def check_login_rate_limit(client_ip: Optional[str], username: str) -> None:
+    """
+    Ограничение попыток входа по IP и по имени пользователя.
+    Проверка выполняется до проверки пароля, чтобы подбор паролей
+    не расходовал время пула хеширования. Попытка, отклоненная по одному
+    лимиту, не расходует другие: подбор с одного IP не блокирует вход владельцу имени.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    checks: RateLimitChecks = []
+    if client_ip:
+        checks.append((f"login:ip:{client_ip}", settings.LOGIN_RATE_LIMIT_PER_IP))
+    checks.append((f"login:user:{username.strip().lower()}", settings.LOGIN_RATE_LIMIT_PER_USERNAME))
+
+    retry_after = await rate_limit_backend.hit(checks, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
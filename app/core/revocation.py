@@ -0,0 +1,93 @@
+import sys
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.models.user import TokenData
+
+# Версия удаленного пользователя: недействительны все его токены
+DELETED_VERSION = sys.maxsize
+
+
+class RevocationRegistry:
+    """
+    Реестр отзыва токенов в памяти процесса.
+
+    Хранит два вида записей:
+    - для пользователя - текущая версия токенов (token_version): токены
+      с меньшей версией в claim "ver" недействительны ("выход на всех устройствах",
+      смена пароля, деактивация, смена роли, удаление);
+    - множество отозванных jti с временем истечения соответствующих токенов.
+
+    Версия нужна только пока живы токены, выпущенные до ее изменения, поэтому
+    записи старше срока жизни токена доступа удаляются. Все проверки выполняются
+    за O(1) без обращения к БД.
+    """
+
+    def __init__(self, retention_seconds: int) -> None:
+        self.retention_seconds = retention_seconds
+        # user_id -> (версия, момент изменения)
+        self._versions: Dict[str, Tuple[int, int]] = {}
+        self._jtis: Dict[str, int] = {}
+        self._next_prune = 0
+
+    def set_version(self, user_id: str, version: int, changed_at: Optional[int] = None) -> None:
+        """Установка текущей версии токенов пользователя (версия только растет)."""
+        if changed_at is None:
+            changed_at = int(time.time())
+        current = self._versions.get(user_id)
+        if current is None or version > current[0]:
+            self._versions[user_id] = (version, changed_at)
+        self._prune()
+
+    def set_versions(self, versions: Iterable[Tuple[str, int]]) -> None:
+        """Установка версий нескольких пользователей за один проход."""
+        now = int(time.time())
+        for user_id, version in versions:
+            current = self._versions.get(user_id)
+            if current is None or version > current[0]:
+                self._versions[user_id] = (version, now)
+        self._prune()
+
+    def revoke_deleted(self, user_ids: Iterable[str]) -> None:
+        """Отзыв всех токенов удаленных пользователей."""
+        self.set_versions((user_id, DELETED_VERSION) for user_id in user_ids)
+
+    def revoke_jti(self, jti: str, expires_at: int) -> None:
+        """Отзыв конкретного токена до момента его истечения."""
+        if expires_at > int(time.time()):
+            self._jtis[jti] = expires_at
+        self._prune()
+
+    def is_jti_revoked(self, jti: Optional[str]) -> bool:
+        """Проверка, отозван ли токен с данным jti."""
+        return jti is not None and jti in self._jtis
+
+    def is_revoked(self, token_data: TokenData) -> bool:
+        """Проверка, отозван ли токен (по jti или по версии токенов пользователя)."""
+        if self.is_jti_revoked(token_data.jti):
+            return True
+        current = self._versions.get(token_data.user_id)
+        return current is not None and token_data.token_version < current[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"versions": len(self._versions), "revoked_jtis": len(self._jtis)}
+
+    def _prune(self) -> None:
+        # Очистка выполняется не чаще раза в минуту, чтобы отзыв оставался дешевым
+        now = int(time.time())
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        threshold = now - self.retention_seconds
+        stale = [user_id for user_id, (_, changed_at) in self._versions.items() if changed_at < threshold]
+        for user_id in stale:
+            del self._versions[user_id]
+        expired = [jti for jti, expires_at in self._jtis.items() if expires_at <= now]
+        for jti in expired:
+            del self._jtis[jti]
+
+
+revocation_registry = RevocationRegistry(
+    retention_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
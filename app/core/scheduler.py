@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.config import settings
+from app.core.metrics import DEFERRED_WRITES, SCHEDULER_DROPPED, SCHEDULER_JOB_DURATION, SCHEDULER_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+Job = Tuple[str, Callable[..., Awaitable[Any]], Tuple[Any, ...]]
+# Отложенная запись: имя коллекции и операция pymongo (InsertOne, UpdateOne, ...)
+DeferredWrite = Tuple[str, Any]
+
+
+class Scheduler:
+    """
+    Фоновые задачи в процессе приложения, вынесенные с пути запроса.
+
+    - submit: разовая задача (например, перехеширование пароля), выполняется пулом воркеров;
+    - defer_write: отложенная запись в MongoDB, записи собираются в пачки и
+      отправляются одним bulk_write на коллекцию;
+    - every: периодическая задача (например, очистка истекших сессий).
+
+    Очереди ограничены: при переполнении задача отбрасывается, запрос не ждет.
+    При остановке принятые задачи и записи дорабатываются (с таймаутом).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        drain_timeout: float
+    ) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._jobs: Optional[asyncio.Queue] = None
+        self._writes: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._writer_task: Optional[asyncio.Task] = None
+        self._periodic_tasks: List[asyncio.Task] = []
+        self._periodic: Dict[str, Tuple[float, Callable[[AsyncIOMotorDatabase], Awaitable[Any]]]] = {}
+        self._accepting = False
+        self._accepting_writes = False
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.writes_flushed = 0
+        self.writes_failed = 0
+
+    def every(self, name: str, interval: float, func: Callable[[AsyncIOMotorDatabase], Awaitable[Any]]) -> None:
+        """Регистрация периодической задачи (до запуска)."""
+        self._periodic[name] = (interval, func)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Запуск воркеров, записи пачками и периодических задач."""
+        self._db = db
+        self._jobs = asyncio.Queue(self.queue_size)
+        self._writes = asyncio.Queue(self.queue_size)
+        self._accepting = True
+        self._accepting_writes = True
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._writer_task = asyncio.create_task(self._writer())
+        self._periodic_tasks = [
+            asyncio.create_task(self._run_periodic(name, interval, func))
+            for name, (interval, func) in self._periodic.items()
+        ]
+
+    def submit(self, name: str, func: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """Постановка разовой задачи в очередь. False, если очередь заполнена или планировщик остановлен."""
+        if not self._accepting:
+            return False
+        try:
+            self._jobs.put_nowait((name, func, args))
+        except asyncio.QueueFull:
+            self._drop("job")
+            return False
+        SCHEDULER_QUEUE_DEPTH.labels(kind="job").inc()
+        return True
+
+    def defer_write(self, collection: str, operation: Any) -> bool:
+        """Отложенная запись в коллекцию. False, если очередь заполнена или планировщик остановлен."""
+        if not self._accepting_writes:
+            return False
+        try:
+            self._writes.put_nowait((collection, operation))
+        except asyncio.QueueFull:
+            self._drop("write")
+            return False
+        SCHEDULER_QUEUE_DEPTH.labels(kind="write").inc()
+        return True
+
+    def _drop(self, kind: str) -> None:
+        self.dropped += 1
+        SCHEDULER_DROPPED.labels(kind=kind).inc()
+        logger.warning("Scheduler %s queue is full, dropping", kind)
+
+    async def _run(self, name: str, func: Callable[..., Awaitable[Any]], args: Tuple[Any, ...]) -> None:
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            await func(*args)
+            self.completed += 1
+        except Exception:
+            status = "error"
+            self.failed += 1
+            logger.exception("Background job %s failed", name)
+        SCHEDULER_JOB_DURATION.labels(job=name, status=status).observe(time.perf_counter() - started)
+
+    async def _worker(self) -> None:
+        while True:
+            name, func, args = await self._jobs.get()
+            SCHEDULER_QUEUE_DEPTH.labels(kind="job").dec()
+            try:
+                await self._run(name, func, args)
+            finally:
+                self._jobs.task_done()
+
+    async def _run_periodic(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[AsyncIOMotorDatabase], Awaitable[Any]]
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._run(name, func, (self._db,))
+
+    async def _writer(self) -> None:
+        """Сбор отложенных записей в пачки: до batch_size или flush_interval."""
+        while True:
+            item = await self._writes.get()
+            if item is None:
+                return
+            batch: List[DeferredWrite] = [item]
+            if self._writes.qsize() < self.batch_size - 1:
+                # Даем записям накопиться, чтобы отправить их одним запросом
+                await asyncio.sleep(self.flush_interval)
+            stop = False
+            while len(batch) < self.batch_size and not self._writes.empty():
+                item = self._writes.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            SCHEDULER_QUEUE_DEPTH.labels(kind="write").dec(len(batch))
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[DeferredWrite]) -> None:
+        """Отправка пачки записей: один bulk_write (ordered=False) на коллекцию."""
+        by_collection: Dict[str, List[Any]] = {}
+        for collection, operation in batch:
+            by_collection.setdefault(collection, []).append(operation)
+
+        for collection, operations in by_collection.items():
+            try:
+                await self._db[collection].bulk_write(operations, ordered=False)
+                written, failed = len(operations), 0
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                written = len(operations) - failed
+                logger.warning("Deferred writes to %s partially failed: %s", collection, failed)
+            except PyMongoError:
+                written, failed = 0, len(operations)
+                logger.exception("Deferred writes to %s failed", collection)
+            self.writes_flushed += written
+            self.writes_failed += failed
+            if written:
+                DEFERRED_WRITES.labels(collection=collection, status="ok").inc(written)
+            if failed:
+                DEFERRED_WRITES.labels(collection=collection, status="error").inc(failed)
+
+    async def stop(self) -> None:
+        """
+        Остановка: новые задачи не принимаются, очередь задач дорабатывается,
+        затем отправляются накопленные записи. Общее ожидание ограничено drain_timeout.
+        """
+        if self._jobs is None:
+            return
+        self._accepting = False
+        for task in self._periodic_tasks:
+            task.cancel()
+
+        deadline = time.monotonic() + self.drain_timeout
+        try:
+            await asyncio.wait_for(self._jobs.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Scheduler drain timed out, %s jobs dropped", self._jobs.qsize())
+        for task in self._tasks:
+            task.cancel()
+
+        # Задачи могли поставить записи, поэтому маркер конца ставится после них
+        self._accepting_writes = False
+
+        async def finish_writes() -> None:
+            await self._writes.put(None)
+            await self._writer_task
+
+        try:
+            await asyncio.wait_for(finish_writes(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            logger.warning("Scheduler drain timed out, %s deferred writes dropped", self._writes.qsize())
+
+        await asyncio.gather(*self._tasks, *self._periodic_tasks, self._writer_task, return_exceptions=True)
+        self._jobs = None
+        self._writes = None
+        self._tasks = []
+        self._writer_task = None
+        self._periodic_tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние очередей и счетчики выполненных задач и записей."""
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending_jobs": self._jobs.qsize() if self._jobs is not None else 0,
+            "pending_writes": self._writes.qsize() if self._writes is not None else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "writes_flushed": self.writes_flushed,
+            "writes_failed": self.writes_failed,
+        }
+
+
+scheduler = Scheduler(
+    workers=settings.SCHEDULER_WORKERS,
+    queue_size=settings.SCHEDULER_QUEUE_SIZE,
+    batch_size=settings.DEFERRED_WRITE_BATCH_SIZE,
+    flush_interval=settings.DEFERRED_WRITE_FLUSH_INTERVAL_SECONDS,
+    drain_timeout=settings.SCHEDULER_DRAIN_TIMEOUT_SECONDS,
+)
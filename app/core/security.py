@@ -1,27 +1,137 @@
 import jwt
+import asyncio
+import uuid
+import secrets
+import hashlib
+import calendar
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from pydantic import ValidationError
 
+from app.core.cache import token_cache
 from app.core.config import settings
+from app.core.hashing import hashing_pool
+from app.core.keys import key_ring
+from app.core.metrics import JWT_DURATION, PASSWORD_HASH_DURATION, timed
+from app.core.revocation import revocation_registry
 from app.models.user import TokenData, UserRole
 
+def _create_pwd_context() -> CryptContext:
+    """
+    Контекст хеширования паролей. Первая схема из PASSWORD_HASH_SCHEMES
+    используется для новых хешей, остальные принимаются при проверке и
+    считаются устаревшими. Хеши с параметрами ниже текущих тоже требуют обновления.
+    """
+    schemes = settings.PASSWORD_HASH_SCHEMES
+    options: Dict[str, Any] = {}
+    if "bcrypt" in schemes:
+        options["bcrypt__rounds"] = settings.PASSWORD_HASH_ROUNDS
+        options["bcrypt__min_rounds"] = settings.PASSWORD_HASH_ROUNDS
+    if "argon2" in schemes:
+        options["argon2__type"] = "ID"
+        options["argon2__time_cost"] = settings.ARGON2_TIME_COST
+        options["argon2__memory_cost"] = settings.ARGON2_MEMORY_COST
+        options["argon2__parallelism"] = settings.ARGON2_PARALLELISM
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
 # Для хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = _create_pwd_context()
+
+
+@timed(PASSWORD_HASH_DURATION, operation="verify")
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля (в пуле хеширования)"""
+    return await hashing_pool.run(pwd_context.verify, plain_password, hashed_password)
+
+
+@timed(PASSWORD_HASH_DURATION, operation="hash")
+async def get_password_hash(password: str) -> str:
+    """Хеширование пароля (в пуле хеширования)"""
+    return await hashing_pool.run(pwd_context.hash, password)
+
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Параллельное хеширование набора паролей (массовый импорт).
+    Задачи ждут свободного места в очереди пула вместо отказа 503, но занимают
+    не больше рабочих потоков, чем есть в пуле, оставляя очередь для входа.
+    """
+    slots = asyncio.Semaphore(hashing_pool.size)
+    
+    async def hash_one(password: str) -> str:
+        async with slots:
+            return await hashing_pool.run(pwd_context.hash, password, wait=True)
+    
+    return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+
+def password_hash_needs_update(hashed_password: str) -> bool:
+    """Проверка, нужно ли перехешировать пароль (другая схема или слабые параметры)"""
+    return pwd_context.needs_update(hashed_password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
+# Хеш случайного пароля для проверки при входе несуществующего пользователя
+_dummy_password_hash: Optional[str] = None
 
 
-def get_password_hash(password: str) -> str:
-    """Хеширование пароля"""
-    return pwd_context.hash(password)
+async def get_dummy_password_hash() -> str:
+    """Получение (однократно вычисляемого) фиктивного хеша"""
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await hashing_pool.run(pwd_context.hash, secrets.token_urlsafe(16), wait=True)
+    return _dummy_password_hash
 
 
+async def verify_dummy_password(plain_password: str) -> None:
+    """
+    Проверка пароля по фиктивному хешу: вход несуществующего пользователя
+    занимает столько же времени, сколько и вход с неверным паролем.
+    """
+    await verify_password(plain_password, await get_dummy_password_hash())
+
+
+def to_timestamp(value: datetime) -> int:
+    """Перевод naive UTC datetime в unix timestamp"""
+    return calendar.timegm(value.utctimetuple())
+
+
+def _from_timestamp(value: Optional[int]) -> Optional[datetime]:
+    """Перевод unix timestamp в naive UTC datetime"""
+    if value is None:
+        return None
+    return datetime.utcfromtimestamp(value)
+
+
+def build_token_claims(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Формирование claims токена доступа из данных пользователя.
+    Кроме идентификации в токен попадают поля профиля, чтобы
+    в stateless-режиме пользователя можно было восстановить без БД.
+    """
+    claims = {
+        "sub": user["id"],
+        "username": user["username"],
+        "email": user["email"],
+        "role": user["role"],
+        "full_name": user.get("full_name"),
+        # Версия токенов пользователя: при ее увеличении выданные токены отзываются
+        "ver": user.get("token_version", 0),
+    }
+    for field in ("created_at", "updated_at"):
+        if isinstance(user.get(field), datetime):
+            claims[field] = to_timestamp(user[field])
+    return claims
+
+
+def new_token_id() -> str:
+    """Генерация уникального идентификатора токена (jti)"""
+    return uuid.uuid4().hex
+
+
+@timed(JWT_DURATION, operation="encode")
 def create_access_token(
     data: Dict[str, Any], 
     expires_delta: Optional[timedelta] = None
@@ -29,51 +139,118 @@ def create_access_token(
     """Создание JWT токена доступа"""
     to_encode = data.copy()
     
-    expire = datetime.utcnow()
+    now = datetime.utcnow()
     if expires_delta:
-        expire += expires_delta
+        expire = now + expires_delta
     else:
-        expire += timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": to_timestamp(now)})
+    to_encode.setdefault("jti", new_token_id())
+    kid, signing_key = key_ring.signing_key()
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.SECRET_KEY, 
-        algorithm=settings.ALGORITHM
+        signing_key, 
+        algorithm=settings.ALGORITHM,
+        headers={"kid": kid} if kid else None
     )
     return encoded_jwt
 
 
+def _verify_token(token: str) -> TokenData:
+    """Проверка подписи JWT токена и разбор claims"""
+    # Ключ выбирается по kid из заголовка (ротация ключей)
+    key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+    if key is None:
+        raise jwt.InvalidKeyError("Unknown signing key")
+    
+    # Срок действия проверяется в decode_token, чтобы вернуть понятную ошибку
+    payload = jwt.decode(
+        token, 
+        key, 
+        algorithms=[settings.ALGORITHM],
+        options={"verify_exp": False, "require": ["exp", "sub"]}
+    )
+    
+    return TokenData(
+        user_id=payload.get("sub"),
+        username=payload.get("username"),
+        email=payload.get("email"),
+        role=payload.get("role"),
+        expires=datetime.utcfromtimestamp(payload.get("exp")),
+        issued_at=payload.get("iat"),
+        jti=payload.get("jti"),
+        full_name=payload.get("full_name"),
+        created_at=_from_timestamp(payload.get("created_at")),
+        updated_at=_from_timestamp(payload.get("updated_at")),
+        token_version=payload.get("ver", 0),
+        session_id=payload.get("sid")
+    )
+
+
+@timed(JWT_DURATION, operation="decode")
 def decode_token(token: str) -> TokenData:
-    """Декодирование JWT токена"""
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        
-        token_data = TokenData(
-            user_id=payload.get("sub"),
-            username=payload.get("username"),
-            email=payload.get("email"),
-            role=payload.get("role"),
-            expires=datetime.fromtimestamp(payload.get("exp"))
-        )
-        
-        # Проверка срока действия токена
-        if datetime.utcnow() > token_data.expires:
+    """
+    Декодирование JWT токена.
+    Уже проверенные токены берутся из кэша (ключ - дайджест токена),
+    срок действия и отзыв проверяются при каждом вызове.
+    """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    token_data = token_cache.get(cache_key)
+    
+    if token_data is None:
+        try:
+            token_data = _verify_token(token)
+        except (jwt.PyJWTError, ValidationError):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expired",
+                detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-            
-        return token_data
-        
-    except (jwt.JWTError, ValidationError):
+        ttl = (token_data.expires - datetime.utcnow()).total_seconds()
+        token_cache.set(cache_key, token_data, ttl=min(ttl, token_cache.ttl))
+    
+    # Проверка срока действия токена
+    if datetime.utcnow() > token_data.expires:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="Token expired",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+    
+    # Проверка отзыва по jti (O(1), без обращения к БД)
+    if revocation_registry.is_jti_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        
+    return token_data
+
+
+def introspect_token(token: str) -> Dict[str, Any]:
+    """
+    Проверка токена доступа для других сервисов (RFC 7662).
+    Недействительный, просроченный или отозванный токен - {"active": False}.
+    """
+    try:
+        token_data = decode_token(token)
+    except HTTPException:
+        return {"active": False}
+    
+    # Отзыв всех токенов пользователя (деактивация, смена роли или пароля)
+    if revocation_registry.is_revoked(token_data):
+        return {"active": False}
+    
+    return {
+        "active": True,
+        "sub": token_data.user_id,
+        "username": token_data.username,
+        "email": token_data.email,
+        "role": token_data.role,
+        "token_type": "bearer",
+        "exp": to_timestamp(token_data.expires),
+        "iat": token_data.issued_at,
+        "jti": token_data.jti,
+    }
@@ -0,0 +1,37 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic_core import PydanticUndefined
+
+from app.models.user import User
+
+# Поля модели User и значения по умолчанию для отсутствующих в документе полей
+_USER_FIELDS: Tuple[Tuple[str, Any], ...] = tuple(
+    (name, None if field.default is PydanticUndefined else field.default)
+    for name, field in User.model_fields.items()
+)
+
+
+def serialize_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Публичное представление пользователя без повторной валидации модели User.
+    Документы в БД записываются только через проверенные модели, поэтому
+    достаточно выбрать поля и подставить значения по умолчанию.
+    """
+    return {name: user.get(name, default) for name, default in _USER_FIELDS}
+
+
+def user_response(user: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Ответ с одним пользователем (минуя response_model)."""
+    return ORJSONResponse(serialize_user(user), headers=headers)
+
+
+def users_response(users: Iterable[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Ответ со списком пользователей (минуя response_model)."""
+    return ORJSONResponse([serialize_user(user) for user in users], headers=headers)
+
+
+def dumps_ndjson(items: List[Dict[str, Any]]) -> bytes:
+    """Кодирование пачки объектов в NDJSON."""
+    return b"".join(orjson.dumps(item, default=str, option=orjson.OPT_APPEND_NEWLINE) for item in items)
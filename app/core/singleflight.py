@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вызовов: пока вызов с ключом
+    выполняется, остальные вызывающие ждут его результат, а не запускают свой.
+
+    Вызов выполняется отдельной задачей, поэтому отмена одного из ожидающих
+    (например, клиент закрыл соединение) не отменяет его для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Выполнение func(*args) не более одного раза одновременно для ключа."""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key: Optional[Hashable] = None) -> None:
+        """
+        Следующие вызовы с ключом (None - с любым ключом) запускают новый вызов,
+        а не ждут уже идущий: его результат мог устареть (например, данные изменены).
+        Уже ожидающие получают результат идущего вызова.
+        """
+        if key is None:
+            self._calls.clear()
+        else:
+            self._calls.pop(key, None)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Ошибка считается полученной, даже если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Количество выполненных и объединенных вызовов."""
+        return {"in_flight": len(self._calls), "calls": self.calls, "shared": self.shared}
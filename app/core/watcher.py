@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.cache import negative_cache, principal_cache
+from app.core.config import settings
+from app.core.revocation import revocation_registry
+from app.core.scheduler import scheduler
+from app.core.security import to_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Коды ошибок MongoDB: change streams недоступны (standalone mongod)
+# и продолжить с сохраненного resume token нельзя (история удалена из oplog)
+_CHANGE_STREAMS_UNSUPPORTED = {40573}
+_HISTORY_LOST = {260, 280, 286}
+
+_WATCHED_FIELDS = ("username", "email", "token_version")
+_WATCHED_COLLECTIONS = ("users", "revoked_tokens")
+
+
+class UserChangeWatcher:
+    """
+    Согласованность кэшей процесса между воркерами и узлами.
+
+    Изменения коллекции users, сделанные любым процессом, применяются к локальным
+    кэшам: запись пользователя в principal_cache сбрасывается, версия токенов
+    попадает в реестр отзыва, негативный кэш входа очищается для новых
+    username/email. Отозванные другими процессами jti из revoked_tokens
+    добавляются в реестр отзыва.
+
+    Основной режим - change stream (replica set), позиция (resume token)
+    периодически сохраняется в БД, чтобы после переподключения или перезапуска
+    продолжить с того же места. На standalone mongod используется опрос по
+    updated_at/token_version_changed_at, по tombstone-записям удаленных пользователей
+    и по revoked_at отозванных токенов.
+    """
+
+    def __init__(self, mode: str, poll_interval: float, checkpoint_interval: float, watcher_id: str) -> None:
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.watcher_id = watcher_id
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._next_checkpoint = 0.0
+        self.active_mode: Optional[str] = None
+        self.events = 0
+        self.errors = 0
+        self.last_event_at: Optional[datetime] = None
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Запуск наблюдения в фоновой задаче (из lifespan)."""
+        if self.mode == "off":
+            return
+        self._db = db
+        state = await db.cache_watch_state.find_one({"_id": self.watcher_id})
+        self._resume_token = state.get("resume_token") if state else None
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка наблюдения с сохранением позиции."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._checkpoint(force=True)
+
+    async def _run(self) -> None:
+        polling = self.mode == "polling"
+        while True:
+            try:
+                if polling:
+                    self.active_mode = "polling"
+                    await self._poll()
+                else:
+                    self.active_mode = "change_stream"
+                    await self._watch()
+            except OperationFailure as e:
+                if e.code in _CHANGE_STREAMS_UNSUPPORTED and self.mode == "auto":
+                    logger.info("Change streams are not supported, falling back to polling")
+                    polling = True
+                    continue
+                self.errors += 1
+                if e.code in _HISTORY_LOST:
+                    # Пропущенные изменения восстановить нельзя - сбрасываем кэши целиком
+                    logger.warning("Change stream history lost, clearing caches")
+                    self._resume_token = None
+                    principal_cache.clear()
+                    negative_cache.clear()
+                    continue
+                logger.warning("User change watcher failed, retrying", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+            except PyMongoError:
+                self.errors += 1
+                logger.warning("User change watcher failed, retrying", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _watch(self) -> None:
+        # Один поток по базе с фильтром по коллекциям: одна позиция для users и revoked_tokens
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(_WATCHED_COLLECTIONS)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        async with self._db.watch(pipeline, start_after=self._resume_token) as stream:
+            async for change in stream:
+                self._apply_change(change)
+                self._resume_token = stream.resume_token
+                self._checkpoint()
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """Применение одного события change stream к локальным кэшам."""
+        operation = change["operationType"]
+        if change["ns"]["coll"] == "revoked_tokens":
+            self._apply_revoked_token(change)
+            return
+        user_id = str(change["documentKey"]["_id"])
+        if operation == "delete":
+            principal_cache.invalidate(user_id)
+            revocation_registry.revoke_deleted([user_id])
+        elif operation == "update":
+            principal_cache.invalidate(user_id)
+            self._apply_fields(user_id, change["updateDescription"]["updatedFields"])
+        else:
+            principal_cache.invalidate(user_id)
+            self._apply_fields(user_id, change.get("fullDocument") or {})
+        self.events += 1
+        self.last_event_at = datetime.utcnow()
+
+    def _apply_revoked_token(self, change: Dict[str, Any]) -> None:
+        """Отзыв jti в локальном реестре (удаление записи по TTL не применяется)."""
+        if change["operationType"] == "update":
+            fields = change["updateDescription"]["updatedFields"]
+        else:
+            fields = change.get("fullDocument") or {}
+        if "expires_at" in fields:
+            self._revoke_jti(change["documentKey"]["_id"], fields["expires_at"])
+            self.events += 1
+            self.last_event_at = datetime.utcnow()
+
+    @staticmethod
+    def _revoke_jti(jti: str, expires_at: datetime) -> None:
+        revocation_registry.revoke_jti(jti, to_timestamp(expires_at))
+
+    def _apply_fields(self, user_id: str, fields: Dict[str, Any]) -> None:
+        for field in ("username", "email"):
+            if field in fields:
+                negative_cache.invalidate((field, fields[field]))
+        if "token_version" in fields:
+            revocation_registry.set_version(user_id, fields["token_version"])
+
+    async def _poll(self) -> None:
+        """
+        Опрос изменений. Окна опроса перекрываются на интервал, чтобы не терять
+        изменения при расхождении часов узлов: повторное применение безопасно.
+        """
+        since = datetime.utcnow() - timedelta(seconds=self.poll_interval)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            started = datetime.utcnow()
+            cursor = self._db.users.find(
+                {"$or": [{"updated_at": {"$gt": since}}, {"token_version_changed_at": {"$gt": since}}]},
+                {field: 1 for field in _WATCHED_FIELDS}
+            )
+            async for user in cursor:
+                user_id = str(user["_id"])
+                principal_cache.invalidate(user_id)
+                self._apply_fields(user_id, user)
+                self.events += 1
+            async for tombstone in self._db.user_tombstones.find({"deleted_at": {"$gt": since}}):
+                user_id = str(tombstone["_id"])
+                principal_cache.invalidate(user_id)
+                revocation_registry.revoke_deleted([user_id])
+                self.events += 1
+            async for token in self._db.revoked_tokens.find({"revoked_at": {"$gt": since}}):
+                self._revoke_jti(token["_id"], token["expires_at"])
+                self.events += 1
+            self.last_event_at = started
+            since = started - timedelta(seconds=self.poll_interval)
+
+    def _checkpoint(self, force: bool = False) -> None:
+        """Сохранение resume token (не чаще checkpoint_interval, отложенной записью)."""
+        if self._resume_token is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_checkpoint:
+            return
+        self._next_checkpoint = now + self.checkpoint_interval
+        scheduler.defer_write("cache_watch_state", UpdateOne(
+            {"_id": self.watcher_id},
+            {"$set": {"resume_token": self._resume_token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.active_mode,
+            "events": self.events,
+            "errors": self.errors,
+            "last_event_at": self.last_event_at,
+        }
+
+
+user_change_watcher = UserChangeWatcher(
+    mode=settings.CACHE_WATCH_MODE,
+    poll_interval=settings.CACHE_POLL_INTERVAL_SECONDS,
+    checkpoint_interval=settings.CACHE_WATCH_CHECKPOINT_SECONDS,
+    watcher_id=settings.CACHE_WATCHER_ID,
+)
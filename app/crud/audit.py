@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any, Optional
+from pymongo import InsertOne
+
+from app.core.scheduler import scheduler
+
+
+def record_event(event: str, user_id: Optional[str] = None, **details: Any) -> None:
+    """
+    Запись события безопасности (вход, выход, смена пароля) в журнал audit_log.
+    Запись отложенная: события отправляются пачками планировщиком.
+    """
+    scheduler.defer_write("audit_log", InsertOne({
+        "event": event,
+        "user_id": user_id,
+        "created_at": datetime.utcnow(),
+        **details,
+    }))
@@ -0,0 +1,281 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+
+from app.core.config import settings, get_token_expire_time
+from app.core.metrics import DB_OPERATION_DURATION, timed
+from app.core.revocation import revocation_registry
+from app.core.scheduler import scheduler
+from app.core.security import build_token_claims, create_access_token, new_token_id, to_timestamp
+from app.crud.user import decode_cursor, encode_cursor
+
+
+async def get_refresh_token_collection(db: AsyncIOMotorDatabase):
+    """Получение коллекции refresh токенов."""
+    return db.refresh_tokens
+
+
+async def get_revoked_token_collection(db: AsyncIOMotorDatabase):
+    """Получение коллекции отозванных токенов доступа."""
+    return db.revoked_tokens
+
+
+async def get_session_collection(db: AsyncIOMotorDatabase):
+    """Получение коллекции сессий (устройств) пользователей."""
+    return db.sessions
+
+
+def _hash_refresh_token(token: str) -> str:
+    """В БД хранится только хеш refresh токена."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@timed(DB_OPERATION_DURATION, operation="issue_tokens")
+async def issue_tokens(
+    db: AsyncIOMotorDatabase,
+    user: Dict[str, Any],
+    family_id: Optional[str] = None,
+    device: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, str]:
+    """
+    Выпуск пары токенов: JWT доступа и непрозрачного refresh токена.
+    Все refresh токены одной цепочки ротации объединены family_id,
+    цепочка соответствует сессии (устройству) пользователя.
+    """
+    now = datetime.utcnow()
+    refresh_expires_at = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    if family_id is None:
+        family_id = await create_session(db, user["id"], device or {}, refresh_expires_at)
+    else:
+        touch_session(family_id, refresh_expires_at)
+    
+    access_expires = get_token_expire_time()
+    access_jti = new_token_id()
+    access_token = create_access_token(
+        data={**build_token_claims(user), "jti": access_jti, "sid": family_id},
+        expires_delta=access_expires
+    )
+
+    refresh_token = secrets.token_urlsafe(32)
+    collection = await get_refresh_token_collection(db)
+    await collection.insert_one({
+        "_id": _hash_refresh_token(refresh_token),
+        "user_id": user["id"],
+        "family_id": family_id,
+        "access_jti": access_jti,
+        "access_expires_at": now + access_expires,
+        "created_at": now,
+        "expires_at": refresh_expires_at,
+        "rotated_at": None,
+    })
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@timed(DB_OPERATION_DURATION, operation="rotate_refresh_token")
+async def rotate_refresh_token(db: AsyncIOMotorDatabase, refresh_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Использование refresh токена: токен атомарно помечается использованным.
+    Повторное предъявление уже использованного токена считается кражей -
+    отзывается вся цепочка вместе с выданными по ней токенами доступа.
+    Возвращает запись токена или None, если токен недействителен.
+    """
+    collection = await get_refresh_token_collection(db)
+    token_hash = _hash_refresh_token(refresh_token)
+    now = datetime.utcnow()
+
+    record = await collection.find_one_and_update(
+        {"_id": token_hash, "rotated_at": None, "expires_at": {"$gt": now}},
+        {"$set": {"rotated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if record:
+        return record
+
+    reused = await collection.find_one({"_id": token_hash}, {"family_id": 1, "rotated_at": 1})
+    if reused and reused.get("rotated_at") is not None:
+        await revoke_token_family(db, reused["family_id"])
+    return None
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_token_family")
+async def revoke_token_family(db: AsyncIOMotorDatabase, family_id: str) -> None:
+    """Отзыв цепочки refresh токенов и выданных по ней токенов доступа."""
+    collection = await get_refresh_token_collection(db)
+    now = datetime.utcnow()
+
+    revoked = []
+    cursor = collection.find(
+        {"family_id": family_id, "access_expires_at": {"$gt": now}},
+        {"access_jti": 1, "access_expires_at": 1}
+    )
+    async for record in cursor:
+        revoked.append({"_id": record["access_jti"], "expires_at": record["access_expires_at"]})
+
+    if revoked:
+        await revoke_access_tokens(db, revoked)
+    await collection.delete_many({"family_id": family_id})
+    session_id = _session_object_id(family_id)
+    if session_id is not None:
+        sessions = await get_session_collection(db)
+        await sessions.delete_one({"_id": session_id})
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_refresh_token")
+async def revoke_refresh_token(db: AsyncIOMotorDatabase, refresh_token: str) -> bool:
+    """Выход из сессии: отзыв цепочки, к которой относится refresh токен."""
+    collection = await get_refresh_token_collection(db)
+    record = await collection.find_one({"_id": _hash_refresh_token(refresh_token)}, {"family_id": 1})
+    if not record:
+        return False
+    await revoke_token_family(db, record["family_id"])
+    return True
+
+
+def _session_object_id(session_id: str) -> Optional[ObjectId]:
+    """ID сессии в БД (цепочки, выпущенные до появления сессий, в реестре не учтены)."""
+    return ObjectId(session_id) if ObjectId.is_valid(session_id) else None
+
+
+async def create_session(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    device: Dict[str, Optional[str]],
+    expires_at: datetime
+) -> str:
+    """Регистрация новой сессии при входе. ID сессии используется как family_id."""
+    collection = await get_session_collection(db)
+    now = datetime.utcnow()
+    result = await collection.insert_one({
+        "user_id": user_id,
+        "user_agent": device.get("user_agent"),
+        "ip": device.get("ip"),
+        "created_at": now,
+        "last_seen_at": now,
+        "expires_at": expires_at,
+    })
+    return str(result.inserted_id)
+
+
+def touch_session(session_id: str, expires_at: datetime) -> None:
+    """Отложенное обновление времени последней активности сессии при ротации."""
+    object_id = _session_object_id(session_id)
+    if object_id is None:
+        return
+    scheduler.defer_write("sessions", UpdateOne(
+        {"_id": object_id},
+        {"$set": {"last_seen_at": datetime.utcnow(), "expires_at": expires_at}}
+    ))
+
+
+@timed(DB_OPERATION_DURATION, operation="get_sessions_page")
+async def get_sessions_page(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Активные сессии пользователя, новые первыми (keyset pagination по _id)."""
+    collection = await get_session_collection(db)
+    filter_query: Dict[str, Any] = {"user_id": user_id, "expires_at": {"$gt": datetime.utcnow()}}
+    if cursor:
+        filter_query["_id"] = {"$lt": decode_cursor(cursor)}
+    
+    documents = await (
+        collection.find(filter_query, {"user_id": 0})
+        .sort("_id", DESCENDING)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]["_id"])
+    
+    for session in documents:
+        session["id"] = str(session.pop("_id"))
+    return documents, next_cursor
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_session")
+async def revoke_session(db: AsyncIOMotorDatabase, user_id: str, session_id: str) -> bool:
+    """Завершение одной сессии пользователя (выход на конкретном устройстве)."""
+    object_id = _session_object_id(session_id)
+    if object_id is None:
+        return False
+    collection = await get_session_collection(db)
+    if not await collection.find_one({"_id": object_id, "user_id": user_id}, {"_id": 1}):
+        return False
+    await revoke_token_family(db, session_id)
+    return True
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_user_sessions")
+async def revoke_user_sessions(db: AsyncIOMotorDatabase, user_id: str) -> None:
+    """
+    Удаление всех refresh токенов и сессий пользователя.
+    Токены доступа отзываются отдельно - увеличением версии токенов.
+    """
+    refresh_tokens = await get_refresh_token_collection(db)
+    sessions = await get_session_collection(db)
+    await refresh_tokens.delete_many({"user_id": user_id})
+    await sessions.delete_many({"user_id": user_id})
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_access_tokens")
+async def revoke_access_tokens(db: AsyncIOMotorDatabase, tokens: List[Dict[str, Any]]) -> None:
+    """
+    Отзыв токенов доступа по jti: запись в реестр в памяти и в коллекцию с TTL индексом,
+    откуда отзыв получают остальные процессы (user_change_watcher) и перезапуски.
+    """
+    collection = await get_revoked_token_collection(db)
+    now = datetime.utcnow()
+    await collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": token["_id"]},
+                {"$set": {"expires_at": token["expires_at"], "revoked_at": now}},
+                upsert=True
+            )
+            for token in tokens
+        ],
+        ordered=False
+    )
+    for token in tokens:
+        revocation_registry.revoke_jti(token["_id"], to_timestamp(token["expires_at"]))
+
+
+async def load_revoked_tokens(db: AsyncIOMotorDatabase) -> int:
+    """Загрузка еще не истекших отозванных jti в реестр при старте."""
+    collection = await get_revoked_token_collection(db)
+    count = 0
+    cursor = collection.find({"expires_at": {"$gt": datetime.utcnow()}})
+    async for token in cursor:
+        revocation_registry.revoke_jti(token["_id"], to_timestamp(token["expires_at"]))
+        count += 1
+    return count
+
+
+async def purge_expired_sessions(db: AsyncIOMotorDatabase) -> int:
+    """
+    Удаление истекших refresh токенов, сессий и записей об отозванных токенах.
+    Дублирует TTL индексы: фоновый процесс MongoDB удаляет документы
+    раз в минуту и может отставать под нагрузкой.
+    """
+    now = datetime.utcnow()
+    refresh_tokens = await get_refresh_token_collection(db)
+    revoked_tokens = await get_revoked_token_collection(db)
+    purged = (await refresh_tokens.delete_many({"expires_at": {"$lte": now}})).deleted_count
+    purged += (await revoked_tokens.delete_many({"expires_at": {"$lte": now}})).deleted_count
+    sessions = await get_session_collection(db)
+    purged += (await sessions.delete_many({"expires_at": {"$lte": now}})).deleted_count
+    return purged
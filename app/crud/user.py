@@ -1,11 +1,27 @@
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import base64
+from datetime import datetime, timedelta
+from typing import Optional, AsyncIterator, Iterable, List, Dict, Any, Tuple
+import bson
 from bson import ObjectId
+from bson.errors import InvalidBSON, InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from fastapi import HTTPException, status
 
-from app.core.security import get_password_hash, verify_password
-from app.models.user import UserCreate, UserUpdate, UserRole
+from app.core.cache import negative_cache, principal_cache, user_stats_cache
+from app.core.config import settings
+from app.core.indexes import CASE_INSENSITIVE
+from app.core.metrics import DB_OPERATION_DURATION, timed
+from app.core.revocation import revocation_registry
+from app.core.scheduler import scheduler
+from app.core.singleflight import SingleFlight
+from app.core.security import (
+    get_password_hash, get_password_hashes, password_hash_needs_update,
+    verify_password, verify_dummy_password, to_timestamp
+)
+from app.models.user import User, UserCreate, UserUpdate, UserRole
+
 
 
 async def get_user_collection(db: AsyncIOMotorDatabase):
@@ -13,46 +29,108 @@ async def get_user_collection(db: AsyncIOMotorDatabase):
     return db.users
 
 
-async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+# Поля, которые сериализуются в модель User (пароль сюда не входит)
+USER_PUBLIC_FIELDS = tuple(field for field in User.model_fields if field != "id")
+# Поля, запрашиваемые по умолчанию: публичные и версия токенов (для claim "ver")
+USER_DEFAULT_FIELDS = USER_PUBLIC_FIELDS + ("token_version",)
+
+
+def user_projection(
+    fields: Optional[Iterable[str]] = None,
+    with_password: bool = False
+) -> Dict[str, int]:
+    """
+    Проекция для запросов к коллекции пользователей.
+    По умолчанию возвращаются публичные поля и версия токенов: хеш пароля
+    запрашивается явно и только там, где он нужен (аутентификация).
+    """
+    projection = {field: 1 for field in (fields if fields is not None else USER_DEFAULT_FIELDS)}
+    if with_password:
+        projection["password"] = 1
+    return projection
+
+
+def _user_from_document(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Преобразование документа MongoDB в словарь пользователя."""
+    user["id"] = str(user.pop("_id"))
+    return user
+
+
+@timed(DB_OPERATION_DURATION, operation="get_user_by_id")
+async def get_user_by_id(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    fields: Optional[Iterable[str]] = None
+) -> Optional[Dict[str, Any]]:
     """Получение пользователя по ID."""
     try:
         collection = await get_user_collection(db)
-        user = await collection.find_one({"_id": ObjectId(user_id)})
-        if user:
-            user["id"] = str(user["_id"])
-            del user["_id"]
-            if "password" in user:
-                del user["password"]
-        return user
+        user = await collection.find_one({"_id": ObjectId(user_id)}, user_projection(fields))
+        return _user_from_document(user) if user else None
     except Exception:
         return None
 
 
-async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> Optional[Dict[str, Any]]:
+# Одновременные запросы одного пользователя при промахе кэша выполняют один find_one
+principal_flight = SingleFlight()
+# После инвалидации пользователя новые запросы не присоединяются к начатому до нее чтению
+principal_cache.on_invalidate(principal_flight.forget)
+
+
+async def load_principal(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Пользователь для авторизации запроса: из principal_cache, при промахе - из БД.
+    Конкурентные промахи по одному user_id (истечение TTL, рестарт процесса) ждут
+    один запрос к MongoDB, результат которого сразу попадает в кэш.
+    """
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    async def load() -> Optional[Dict[str, Any]]:
+        # Изменение пользователя во время чтения не должно вернуть в кэш старый документ
+        generation = principal_cache.generation()
+        loaded = await get_user_by_id(db, user_id)
+        if loaded is not None:
+            principal_cache.set(user_id, loaded, generation=generation)
+        return loaded
+    
+    return await principal_flight.do(user_id, load)
+
+
+@timed(DB_OPERATION_DURATION, operation="get_user_by_email")
+async def get_user_by_email(
+    db: AsyncIOMotorDatabase,
+    email: str,
+    fields: Optional[Iterable[str]] = None,
+    with_password: bool = False
+) -> Optional[Dict[str, Any]]:
     """Получение пользователя по email."""
     collection = await get_user_collection(db)
-    user = await collection.find_one({"email": email})
-    if user:
-        user["id"] = str(user["_id"])
-        del user["_id"]
-    return user
+    user = await collection.find_one({"email": email}, user_projection(fields, with_password))
+    return _user_from_document(user) if user else None
 
 
-async def get_user_by_username(db: AsyncIOMotorDatabase, username: str) -> Optional[Dict[str, Any]]:
+@timed(DB_OPERATION_DURATION, operation="get_user_by_username")
+async def get_user_by_username(
+    db: AsyncIOMotorDatabase,
+    username: str,
+    fields: Optional[Iterable[str]] = None,
+    with_password: bool = False
+) -> Optional[Dict[str, Any]]:
     """Получение пользователя по username."""
     collection = await get_user_collection(db)
-    user = await collection.find_one({"username": username})
-    if user:
-        user["id"] = str(user["_id"])
-        del user["_id"]
-    return user
+    user = await collection.find_one({"username": username}, user_projection(fields, with_password))
+    return _user_from_document(user) if user else None
 
 
+@timed(DB_OPERATION_DURATION, operation="get_users")
 async def get_users(
     db: AsyncIOMotorDatabase, 
     skip: int = 0, 
     limit: int = 100, 
-    role: Optional[UserRole] = None
+    role: Optional[UserRole] = None,
+    fields: Optional[Iterable[str]] = None
 ) -> List[Dict[str, Any]]:
     """Получение списка пользователей."""
     collection = await get_user_collection(db)
@@ -62,105 +140,676 @@ async def get_users(
     if role:
         filter_query["role"] = role
     
-    cursor = collection.find(filter_query).skip(skip).limit(limit)
-    users = []
-    
-    async for user in cursor:
-        user["id"] = str(user["_id"])
-        del user["_id"]
-        if "password" in user:
-            del user["password"]
-        users.append(user)
-        
-    return users
+    cursor = collection.find(filter_query, user_projection(fields)).skip(skip).limit(limit)
+    return [_user_from_document(user) async for user in cursor]
 
 
-async def create_user(db: AsyncIOMotorDatabase, user_data: UserCreate) -> Dict[str, Any]:
-    """Создание нового пользователя."""
-    # Проверка наличия пользователя с таким же email
-    if await get_user_by_email(db, user_data.email):
+def encode_cursor(object_id: ObjectId) -> str:
+    """Непрозрачный курсор страницы: base64url от ObjectId последней записи."""
+    return base64.urlsafe_b64encode(object_id.binary).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    """Разбор курсора страницы."""
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, InvalidId):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail="Invalid cursor"
         )
+
+
+@timed(DB_OPERATION_DURATION, operation="get_users_page")
+async def get_users_page(
+    db: AsyncIOMotorDatabase,
+    limit: int = 100,
+    role: Optional[UserRole] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Постраничное получение пользователей по курсору (keyset pagination по _id).
+    Стоимость страницы не зависит от ее номера. Возвращает список и курсор
+    следующей страницы (None, если страница последняя).
+    """
+    collection = await get_user_collection(db)
     
-    # Проверка наличия пользователя с таким же username
-    if await get_user_by_username(db, user_data.username):
+    # Построение фильтра (использует индекс role + _id)
+    filter_query: Dict[str, Any] = {}
+    if role:
+        filter_query["role"] = role
+    if cursor:
+        filter_query["_id"] = {"$gt": decode_cursor(cursor)}
+    
+    # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+    documents = await (
+        collection.find(filter_query, user_projection(fields))
+        .sort("_id", ASCENDING)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]["_id"])
+    
+    return [_user_from_document(user) for user in documents], next_cursor
+
+
+# Поля, по которым выполняется поиск по префиксу без учета регистра
+SEARCH_FIELDS = ("username", "email", "full_name")
+# Верхняя граница диапазона префикса: U+FFFF сортируется после любых символов
+_PREFIX_UPPER_BOUND = "\uffff"
+
+
+def _prefix_range(prefix: str) -> Dict[str, str]:
+    """
+    Префикс как диапазон строк: в отличие от $regex диапазон использует
+    индекс с регистронезависимой collation.
+    """
+    return {"$gte": prefix, "$lt": prefix + _PREFIX_UPPER_BOUND}
+
+
+def build_search_filter(
+    q: Optional[str] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    full_name: Optional[str] = None,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Фильтр поиска пользователей: q - префикс любого из полей username/email/full_name,
+    username/email/full_name - префикс конкретного поля, created_from/created_to - полуинтервал даты создания.
+    """
+    filter_query: Dict[str, Any] = {}
+    if q:
+        filter_query["$or"] = [{field: _prefix_range(q)} for field in SEARCH_FIELDS]
+    for field, prefix in (("username", username), ("email", email), ("full_name", full_name)):
+        if prefix:
+            filter_query[field] = _prefix_range(prefix)
+    if role:
+        filter_query["role"] = role
+    if is_active is not None:
+        filter_query["is_active"] = is_active
+    created_range: Dict[str, datetime] = {}
+    if created_from:
+        created_range["$gte"] = created_from
+    if created_to:
+        created_range["$lt"] = created_to
+    if created_range:
+        filter_query["created_at"] = created_range
+    return filter_query
+
+
+# Индексы поиска по префиксу: (поле, _id) с collation - порядок страниц задает индекс
+SEARCH_INDEXES = {field: f"{field}_1__id_1_ci" for field in SEARCH_FIELDS}
+
+
+def search_phases(filter_query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Запросы, из которых состоит поиск. q ($or по трем полям) выполняется по очереди
+    по username, email и full_name: у каждого поля свой порядок (поле, _id), общего
+    порядка для индексной сортировки у $or нет. Пользователь, совпавший по
+    предыдущему полю, в следующих запросах исключается ($nor).
+    """
+    if "$or" not in filter_query or any(field in filter_query for field in SEARCH_FIELDS):
+        return [filter_query]
+    base = {key: value for key, value in filter_query.items() if key != "$or"}
+    phases = []
+    for index, condition in enumerate(filter_query["$or"]):
+        phase = {**base, **condition}
+        if index:
+            phase["$nor"] = filter_query["$or"][:index]
+        phases.append(phase)
+    return phases
+
+
+def search_sort_field(filter_query: Dict[str, Any]) -> Optional[str]:
+    """
+    Поле, по которому (вместе с _id) упорядочен запрос поиска: ведущее поле индекса,
+    чтобы страница читала limit записей индекса, а не сортировала все совпадения.
+    None - сортировка только по _id.
+    """
+    for field in SEARCH_FIELDS:
+        if field in filter_query:
+            return field
+    if "is_active" in filter_query or "created_at" in filter_query:
+        return "created_at"
+    return None
+
+
+def search_index(filter_query: Dict[str, Any]) -> Optional[str]:
+    """
+    Индекс для запроса поиска (задается явно, чтобы планировщик не выбрал _id_
+    с фильтрацией всей коллекции). None - запрос без фильтров, только по _id.
+    """
+    sort_field = search_sort_field(filter_query)
+    if sort_field in SEARCH_INDEXES:
+        return SEARCH_INDEXES[sort_field]
+    if sort_field == "created_at":
+        return "is_active_1_created_at_1__id_1" if "is_active" in filter_query else "created_at_1__id_1"
+    if "role" in filter_query:
+        return "role_1__id_1"
+    return None
+
+
+def _keyset_condition(sort_field: Optional[str], after: Tuple[Any, ObjectId]) -> Dict[str, Any]:
+    """Условие "после записи (value, _id)" для порядка (sort_field, _id)."""
+    value, object_id = after
+    if sort_field is None:
+        return {"_id": {"$gt": object_id}}
+    # Границы индекса по полю сужаются до value; записи с тем же значением
+    # и не большим _id (уже выданные) отбрасываются фильтром
+    return {"$and": [
+        {sort_field: {"$gte": value}},
+        {"$nor": [{sort_field: value, "_id": {"$lte": object_id}}]},
+    ]}
+
+
+def search_cursor(
+    collection,
+    filter_query: Dict[str, Any],
+    limit: int,
+    fields: Optional[Iterable[str]] = None,
+    after: Optional[Tuple[Any, ObjectId]] = None
+):
+    """
+    Один запрос поиска (элемент search_phases) в порядке (search_sort_field, _id),
+    начиная после записи after. Регистронезависимая collation (как у индексов поиска)
+    задается только для запросов по префиксу: индексы даты, активности и роли созданы
+    с простой collation и иначе не могут использоваться для сортировки и диапазонов строк.
+    """
+    sort_field = search_sort_field(filter_query)
+    sort = [("_id", ASCENDING)]
+    projection = user_projection(fields)
+    if sort_field is not None:
+        sort.insert(0, (sort_field, ASCENDING))
+        projection[sort_field] = 1
+    query = filter_query
+    if after is not None:
+        query = {"$and": [filter_query, _keyset_condition(sort_field, after)]}
+    options: Dict[str, Any] = {}
+    if sort_field in SEARCH_FIELDS:
+        options["collation"] = CASE_INSENSITIVE
+    cursor = collection.find(query, projection, **options).sort(sort).limit(limit)
+    index = search_index(filter_query)
+    return cursor.hint(index) if index else cursor
+
+
+def encode_search_cursor(phase: int, value: Any, object_id: ObjectId) -> str:
+    """Курсор страницы поиска: номер запроса из search_phases, значение поля сортировки и _id (BSON, base64url)."""
+    return base64.urlsafe_b64encode(bson.encode({"p": phase, "v": value, "id": object_id})).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str, phases: int) -> Tuple[int, Tuple[Any, ObjectId]]:
+    """Разбор курсора страницы поиска."""
+    try:
+        data = bson.decode(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        phase, value, object_id = data["p"], data.get("v"), data["id"]
+    except (ValueError, TypeError, KeyError, InvalidBSON):
+        phase = object_id = None
+    if not isinstance(phase, int) or not 0 <= phase < phases or not isinstance(object_id, ObjectId):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
+            detail="Invalid cursor"
         )
+    return phase, (value, object_id)
+
+
+@timed(DB_OPERATION_DURATION, operation="search_users")
+async def search_users(
+    db: AsyncIOMotorDatabase,
+    filter_query: Dict[str, Any],
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Поиск пользователей по фильтру build_search_filter с постраничным выводом по курсору.
+    Страница читает не больше limit + 1 записей каждого индекса независимо от числа совпадений.
+    Возвращает список и курсор следующей страницы (None, если страница последняя).
+    """
+    collection = await get_user_collection(db)
+    phases = search_phases(filter_query)
+    phase, after = 0, None
+    if cursor:
+        phase, after = decode_search_cursor(cursor, len(phases))
     
-    # Подготовка данных для вставки
+    found: List[Tuple[int, Dict[str, Any]]] = []
+    for index in range(phase, len(phases)):
+        remaining = limit + 1 - len(found)
+        documents = await search_cursor(
+            collection, phases[index], remaining, fields, after if index == phase else None
+        ).to_list(length=remaining)
+        found.extend((index, document) for document in documents)
+        if len(found) > limit:
+            break
+    
+    next_cursor = None
+    if len(found) > limit:
+        found = found[:limit]
+        index, last = found[-1]
+        sort_field = search_sort_field(phases[index])
+        next_cursor = encode_search_cursor(index, last.get(sort_field) if sort_field else None, last["_id"])
+    
+    return [_user_from_document(document) for _, document in found], next_cursor
+
+
+# Одновременные запросы статистики с одинаковыми параметрами выполняют одну агрегацию
+user_stats_flight = SingleFlight()
+
+
+@timed(DB_OPERATION_DURATION, operation="aggregate_user_stats")
+async def aggregate_user_stats(db: AsyncIOMotorDatabase, days: int, exact: bool) -> Dict[str, Any]:
+    """
+    Статистика пользователей одним aggregation pipeline ($facet): количество по ролям,
+    активные/неактивные, регистрации по дням за последние days дней.
+    Общее количество - estimated_document_count (по метаданным коллекции), если не нужна точность.
+    """
+    collection = await get_user_collection(db)
     now = datetime.utcnow()
+    since = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    pipeline = [
+        {"$facet": {
+            "by_role": [{"$group": {"_id": "$role", "count": {"$sum": 1}}}],
+            # Пользователи без is_active считаются неактивными, как и при авторизации
+            "by_status": [{"$group": {"_id": {"$ifNull": ["$is_active", False]}, "count": {"$sum": 1}}}],
+            "signups": [
+                {"$match": {"created_at": {"$gte": since}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+        }},
+    ]
+    facets = (await collection.aggregate(pipeline).to_list(length=1))[0]
+    
+    if exact:
+        total = await collection.count_documents({})
+    else:
+        total = await collection.estimated_document_count()
+    
+    by_status = {group["_id"]: group["count"] for group in facets["by_status"]}
+    return {
+        "total": total,
+        "total_exact": exact,
+        "by_role": {group["_id"]: group["count"] for group in facets["by_role"] if group["_id"] is not None},
+        "active": by_status.get(True, 0),
+        "inactive": by_status.get(False, 0),
+        "signups_per_day": [{"date": group["_id"], "count": group["count"]} for group in facets["signups"]],
+        "generated_at": now,
+    }
+
+
+async def get_user_stats(db: AsyncIOMotorDatabase, days: int = 30, exact: bool = False) -> Dict[str, Any]:
+    """
+    Статистика пользователей с кэшем на USER_STATS_CACHE_TTL_SECONDS.
+    При промахе кэша одновременные запросы ждут одну агрегацию, поэтому
+    опрос дашбордами стоит одну агрегацию за интервал при любом числе клиентов.
+    """
+    key = (days, exact)
+    stats = user_stats_cache.get(key)
+    if stats is not None:
+        return stats
+    
+    async def refresh() -> Dict[str, Any]:
+        result = await aggregate_user_stats(db, days, exact)
+        user_stats_cache.set(key, result)
+        return result
+    
+    return await user_stats_flight.do(key, refresh)
+
+
+async def iter_users(
+    db: AsyncIOMotorDatabase,
+    role: Optional[UserRole] = None,
+    fields: Optional[Iterable[str]] = None,
+    batch_size: int = 1000
+) -> AsyncIterator[Dict[str, Any]]:
+    """Потоковый обход пользователей курсором MongoDB (память ограничена размером пачки)."""
+    collection = await get_user_collection(db)
+    
+    filter_query = {}
+    if role:
+        filter_query["role"] = role
+    
+    cursor = (
+        collection.find(filter_query, user_projection(fields))
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+    async for user in cursor:
+        yield _user_from_document(user)
+
+
+def _token_version_update(now: datetime) -> Dict[str, Any]:
+    """Увеличение версии токенов: все ранее выданные токены пользователя отзываются."""
+    return {
+        "$inc": {"token_version": 1},
+        "$set": {"token_version_changed_at": now},
+    }
+
+
+def _merge_updates(*updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Объединение операторов обновления MongoDB ($set, $inc, ...)."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for update in updates:
+        for operator, fields in update.items():
+            merged.setdefault(operator, {}).update(fields)
+    return merged
+
+
+def _duplicate_key_detail(details: Dict[str, Any], message: str) -> str:
+    """Сообщение об ошибке по нарушенному уникальному индексу."""
+    fields = set((details.get("keyPattern") or details.get("keyValue") or {}).keys())
+    if not fields:
+        # Старые версии MongoDB сообщают только имя индекса в тексте ошибки
+        fields = {"email"} if "email_" in message else {"username"}
+    
+    if "email" in fields:
+        return "Email already registered"
+    return "Username already taken"
+
+
+def _duplicate_key_exception(exc: DuplicateKeyError) -> HTTPException:
+    """Преобразование нарушения уникального индекса в ошибку API."""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=_duplicate_key_detail(exc.details or {}, str(exc))
+    )
+
+
+def _new_user_document(user_data: UserCreate, hashed_password: str, now: datetime) -> Dict[str, Any]:
+    """Подготовка документа нового пользователя для вставки."""
     user_dict = user_data.model_dump()
-    user_dict["password"] = get_password_hash(user_dict["password"])
+    user_dict["password"] = hashed_password
+    user_dict["is_active"] = True
     user_dict["created_at"] = now
     user_dict["updated_at"] = now
+    return user_dict
+
+
+@timed(DB_OPERATION_DURATION, operation="create_user")
+async def create_user(db: AsyncIOMotorDatabase, user_data: UserCreate) -> Dict[str, Any]:
+    """
+    Создание нового пользователя.
+    Уникальность email и username обеспечивается индексами: одна вставка без предварительных проверок.
+    """
+    # Подготовка данных для вставки
+    hashed_password = await get_password_hash(user_data.password)
+    user_dict = _new_user_document(user_data, hashed_password, datetime.utcnow())
     
     # Вставка в базу данных
     collection = await get_user_collection(db)
-    result = await collection.insert_one(user_dict)
+    try:
+        result = await collection.insert_one(user_dict)
+    except DuplicateKeyError as e:
+        raise _duplicate_key_exception(e)
     
-    # Получение созданного пользователя
-    user = await get_user_by_id(db, str(result.inserted_id))
-    return user
+    negative_cache.invalidate_many([("email", user_dict["email"]), ("username", user_dict["username"])])
+    
+    # Ответ формируется из вставленного документа, без повторного чтения
+    user_dict["id"] = str(result.inserted_id)
+    del user_dict["_id"]
+    del user_dict["password"]
+    return user_dict
+
+
+@timed(DB_OPERATION_DURATION, operation="bulk_create_users")
+async def bulk_create_users(
+    db: AsyncIOMotorDatabase,
+    users: List[UserCreate]
+) -> List[Dict[str, Any]]:
+    """
+    Массовое создание пользователей: пароли хешируются параллельно в пуле,
+    вставка - одним неупорядоченным insert_many. Возвращает результат
+    для каждого пользователя в том же порядке: {"id": ...} или {"error": ...}.
+    """
+    if not users:
+        return []
+    
+    hashed_passwords = await get_password_hashes([user.password for user in users])
+    now = datetime.utcnow()
+    documents = [
+        _new_user_document(user, hashed_password, now)
+        for user, hashed_password in zip(users, hashed_passwords)
+    ]
+    
+    errors: Dict[int, str] = {}
+    collection = await get_user_collection(db)
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            if write_error.get("code") == 11000:
+                errors[write_error["index"]] = _duplicate_key_detail(write_error, write_error.get("errmsg", ""))
+            else:
+                errors[write_error["index"]] = write_error.get("errmsg", "Write error")
+    
+    results = []
+    negative_keys = []
+    for index, document in enumerate(documents):
+        if index in errors:
+            results.append({"error": errors[index]})
+        else:
+            # _id назначается драйвером до отправки документа
+            results.append({"id": str(document["_id"])})
+            negative_keys.extend([("email", document["email"]), ("username", document["username"])])
+    negative_cache.invalidate_many(negative_keys)
+    return results
 
 
+@timed(DB_OPERATION_DURATION, operation="update_user")
 async def update_user(
     db: AsyncIOMotorDatabase, 
     user_id: str, 
     user_data: UserUpdate
 ) -> Optional[Dict[str, Any]]:
-    """Обновление данных пользователя."""
-    # Проверка существования пользователя
-    existing_user = await get_user_by_id(db, user_id)
-    if not existing_user:
+    """Обновление данных пользователя одним запросом find_one_and_update."""
+    try:
+        object_id = ObjectId(user_id)
+    except InvalidId:
         return None
     
     # Подготовка данных для обновления (исключаем None значения)
     update_data = {k: v for k, v in user_data.model_dump(exclude_unset=True).items() if v is not None}
     
-    # Проверка уникальности email, если он изменяется
-    if "email" in update_data and update_data["email"] != existing_user.get("email"):
-        if await get_user_by_email(db, update_data["email"]):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    
-    # Проверка уникальности username, если он изменяется
-    if "username" in update_data and update_data["username"] != existing_user.get("username"):
-        if await get_user_by_username(db, update_data["username"]):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-    
     # Добавляем время обновления
-    update_data["updated_at"] = datetime.utcnow()
+    now = datetime.utcnow()
+    update_data["updated_at"] = now
+    
+    # Деактивация и смена роли отзывают выданные токены
+    revoke_tokens = update_data.get("is_active") is False or "role" in update_data
+    update = {"$set": update_data}
+    if revoke_tokens:
+        update = _merge_updates(update, _token_version_update(now))
     
-    # Выполнение обновления
+    # Выполнение обновления (уникальность email/username проверяют индексы)
     collection = await get_user_collection(db)
-    await collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": update_data}
-    )
+    try:
+        user = await collection.find_one_and_update(
+            {"_id": object_id},
+            update,
+            projection=user_projection(),
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError as e:
+        raise _duplicate_key_exception(e)
+    
+    if not user:
+        return None
+    
+    principal_cache.invalidate(user_id)
+    for field in ("email", "username"):
+        if field in update_data:
+            negative_cache.invalidate((field, update_data[field]))
+    if revoke_tokens:
+        revocation_registry.set_version(user_id, user.get("token_version", 0))
     
     # Возвращаем обновленного пользователя
-    return await get_user_by_id(db, user_id)
+    return _user_from_document(user)
 
 
+@timed(DB_OPERATION_DURATION, operation="delete_user")
 async def delete_user(db: AsyncIOMotorDatabase, user_id: str) -> bool:
     """Удаление пользователя."""
     try:
         collection = await get_user_collection(db)
         result = await collection.delete_one({"_id": ObjectId(user_id)})
+        principal_cache.invalidate(user_id)
+        revocation_registry.revoke_deleted([user_id])
+        if result.deleted_count:
+            await _record_tombstones(db, [ObjectId(user_id)])
         return result.deleted_count > 0
     except Exception:
         return False
 
 
+# Количество пользователей, обрабатываемых одним запросом в пакетных операциях
+BATCH_CHUNK_SIZE = 5000
+
+
+def _batch_filter(
+    ids: Optional[List[str]],
+    role: Optional[UserRole],
+    exclude_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Фильтр пакетной операции: по списку ID и/или по роли."""
+    filter_query: Dict[str, Any] = {}
+    id_conditions: Dict[str, Any] = {}
+    if ids is not None:
+        try:
+            id_conditions["$in"] = [ObjectId(user_id) for user_id in ids]
+        except InvalidId:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID"
+            )
+    if exclude_id is not None:
+        id_conditions["$ne"] = ObjectId(exclude_id)
+    if id_conditions:
+        filter_query["_id"] = id_conditions
+    if role:
+        filter_query["role"] = role
+    return filter_query
+
+
+async def _iter_id_chunks(collection, filter_query: Dict[str, Any]) -> AsyncIterator[List[ObjectId]]:
+    """Обход ID подходящих пользователей пачками (память ограничена размером пачки)."""
+    chunk: List[ObjectId] = []
+    cursor = collection.find(filter_query, {"_id": 1}).batch_size(BATCH_CHUNK_SIZE)
+    async for document in cursor:
+        chunk.append(document["_id"])
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _record_tombstones(db: AsyncIOMotorDatabase, object_ids: List[ObjectId]) -> None:
+    """
+    Отметки об удалении пользователей для процессов, которые следят за
+    изменениями опросом (удаленный документ опросом не обнаружить).
+    """
+    now = datetime.utcnow()
+    await db.user_tombstones.bulk_write(
+        [UpdateOne({"_id": object_id}, {"$set": {"deleted_at": now}}, upsert=True) for object_id in object_ids],
+        ordered=False
+    )
+
+
+async def load_user_tombstones(db: AsyncIOMotorDatabase, since: datetime) -> int:
+    """
+    Загрузка пользователей, удаленных после since, в реестр отзыва при старте.
+    Удаленных нет в коллекции users, а наблюдение за изменениями начинается с момента
+    старта, поэтому без этого процесс принимал бы еще не истекшие токены удаленных.
+    """
+    user_ids = [str(tombstone["_id"]) async for tombstone in db.user_tombstones.find({"deleted_at": {"$gt": since}})]
+    revocation_registry.revoke_deleted(user_ids)
+    return len(user_ids)
+
+
+def _invalidate_users(user_ids: List[str]) -> None:
+    """Сброс кэшей для затронутых пользователей за один проход."""
+    principal_cache.invalidate_many(user_ids)
+
+
+@timed(DB_OPERATION_DURATION, operation="update_users_batch")
+async def update_users_batch(
+    db: AsyncIOMotorDatabase,
+    user_data: UserUpdate,
+    ids: Optional[List[str]] = None,
+    role: Optional[UserRole] = None,
+    exclude_id: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Пакетное обновление пользователей по списку ID и/или роли (update_many).
+    Username и email уникальны, поэтому пакетно не изменяются.
+    exclude_id - пользователь, который не изменяется (текущий администратор).
+    """
+    update_data = {k: v for k, v in user_data.model_dump(exclude_unset=True).items() if v is not None}
+    if "username" in update_data or "email" in update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username and email cannot be changed in batch"
+        )
+    now = datetime.utcnow()
+    update_data["updated_at"] = now
+    
+    # Деактивация и смена роли отзывают выданные токены
+    revoke_tokens = update_data.get("is_active") is False or "role" in update_data
+    update = {"$set": update_data}
+    if revoke_tokens:
+        update = _merge_updates(update, _token_version_update(now))
+    
+    collection = await get_user_collection(db)
+    matched = modified = 0
+    async for chunk in _iter_id_chunks(collection, _batch_filter(ids, role, exclude_id)):
+        result = await collection.update_many({"_id": {"$in": chunk}}, update)
+        matched += result.matched_count
+        modified += result.modified_count
+        _invalidate_users([str(object_id) for object_id in chunk])
+        if revoke_tokens:
+            # Новые версии читаются одним запросом на пачку
+            versions = collection.find({"_id": {"$in": chunk}}, {"token_version": 1})
+            revocation_registry.set_versions(
+                [(str(user["_id"]), user.get("token_version", 0)) async for user in versions]
+            )
+    
+    return {"matched": matched, "modified": modified}
+
+
+@timed(DB_OPERATION_DURATION, operation="delete_users_batch")
+async def delete_users_batch(
+    db: AsyncIOMotorDatabase,
+    ids: Optional[List[str]] = None,
+    role: Optional[UserRole] = None,
+    exclude_id: Optional[str] = None
+) -> Dict[str, int]:
+    """Пакетное удаление пользователей по списку ID и/или роли (delete_many)."""
+    collection = await get_user_collection(db)
+    deleted = 0
+    async for chunk in _iter_id_chunks(collection, _batch_filter(ids, role, exclude_id)):
+        result = await collection.delete_many({"_id": {"$in": chunk}})
+        deleted += result.deleted_count
+        user_ids = [str(object_id) for object_id in chunk]
+        _invalidate_users(user_ids)
+        revocation_registry.revoke_deleted(user_ids)
+        await _record_tombstones(db, chunk)
+    
+    return {"deleted": deleted}
+
+
+@timed(DB_OPERATION_DURATION, operation="authenticate_user")
 async def authenticate_user(
     db: AsyncIOMotorDatabase, 
     username_or_email: str, 
@@ -169,27 +818,71 @@ async def authenticate_user(
     """Аутентификация пользователя по имени пользователя/email и паролю."""
     # Проверка, является ли входная строка email
     is_email = "@" in username_or_email
+    negative_key = ("email" if is_email else "username", username_or_email)
+    
+    # Известно, что такого пользователя нет: БД не запрашиваем,
+    # но пароль проверяем по фиктивному хешу, чтобы время ответа не выдавало это
+    if negative_cache.get(negative_key):
+        await verify_dummy_password(password)
+        return None
     
     # Поиск пользователя
     if is_email:
-        user = await get_user_by_email(db, username_or_email)
+        user = await get_user_by_email(db, username_or_email, with_password=True)
     else:
-        user = await get_user_by_username(db, username_or_email)
+        user = await get_user_by_username(db, username_or_email, with_password=True)
     
     if not user:
+        negative_cache.set(negative_key, True)
+        await verify_dummy_password(password)
         return None
     
     # Проверка пароля
-    if not verify_password(password, user.get("password", "")):
+    hashed_password = user.pop("password", "")
+    if not await verify_password(password, hashed_password):
         return None
     
-    # Удаление пароля из возвращаемых данных
-    if "password" in user:
-        del user["password"]
+    # Перехеширование устаревшего хеша в фоне, чтобы не увеличивать время входа
+    if settings.PASSWORD_REHASH_ON_LOGIN and password_hash_needs_update(hashed_password):
+        scheduler.submit("upgrade_password_hash", upgrade_password_hash, db, user["id"], password, hashed_password)
     
     return user
 
 
+def track_last_login(user_id: str) -> None:
+    """Отложенная запись времени последнего входа (пачкой, вне пути запроса)."""
+    scheduler.defer_write(
+        "users",
+        UpdateOne({"_id": ObjectId(user_id)}, {"$max": {"last_login_at": datetime.utcnow()}})
+    )
+
+
+@timed(DB_OPERATION_DURATION, operation="upgrade_password_hash")
+async def upgrade_password_hash(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    password: str,
+    old_hash: str
+) -> bool:
+    """
+    Замена устаревшего хеша пароля хешем по текущей схеме.
+    Обновление условное: если пароль успели сменить, старый хеш не совпадет.
+    """
+    try:
+        new_hash = await get_password_hash(password)
+    except HTTPException:
+        # Пул хеширования перегружен - обновим при следующем входе
+        return False
+    
+    collection = await get_user_collection(db)
+    result = await collection.update_one(
+        {"_id": ObjectId(user_id), "password": old_hash},
+        {"$set": {"password": new_hash}}
+    )
+    return result.modified_count > 0
+
+
+@timed(DB_OPERATION_DURATION, operation="change_user_password")
 async def change_user_password(
     db: AsyncIOMotorDatabase, 
     user_id: str, 
@@ -197,29 +890,74 @@ async def change_user_password(
     new_password: str
 ) -> bool:
     """Изменение пароля пользователя."""
-    # Получение пользователя с паролем
+    # Получение только хеша пароля
     collection = await get_user_collection(db)
-    user = await collection.find_one({"_id": ObjectId(user_id)})
+    user = await collection.find_one({"_id": ObjectId(user_id)}, {"password": 1})
     
     if not user:
         return False
     
     # Проверка текущего пароля
-    if not verify_password(current_password, user.get("password", "")):
+    if not await verify_password(current_password, user.get("password", "")):
         return False
     
     # Хеширование нового пароля
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await get_password_hash(new_password)
     
-    # Обновление пароля
-    await collection.update_one(
+    # Обновление пароля с отзывом всех выданных токенов
+    now = datetime.utcnow()
+    user = await collection.find_one_and_update(
         {"_id": ObjectId(user_id)},
-        {
-            "$set": {
-                "password": hashed_password,
-                "updated_at": datetime.utcnow()
-            }
-        }
+        _merge_updates(
+            {"$set": {"password": hashed_password, "updated_at": now}},
+            _token_version_update(now)
+        ),
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER
     )
+    principal_cache.invalidate(user_id)
+    if user:
+        revocation_registry.set_version(user_id, user["token_version"])
     
-    return True 
\ No newline at end of file
+    return True 
+
+
+@timed(DB_OPERATION_DURATION, operation="revoke_user_tokens")
+async def revoke_user_tokens(db: AsyncIOMotorDatabase, user_id: str) -> bool:
+    """
+    Выход на всех устройствах: увеличение версии токенов пользователя.
+    Все выданные токены доступа перестают действовать сразу, без списка отозванных jti.
+    """
+    collection = await get_user_collection(db)
+    user = await collection.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        _token_version_update(datetime.utcnow()),
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not user:
+        return False
+    principal_cache.invalidate(user_id)
+    revocation_registry.set_version(user_id, user["token_version"])
+    return True
+
+
+async def load_token_versions(db: AsyncIOMotorDatabase, since: datetime) -> int:
+    """
+    Загрузка версий токенов, измененных после since, в реестр отзыва.
+    Более ранние изменения не нужны: выданные до них токены уже истекли.
+    Удаленных пользователей в коллекции нет - при старте вместе с этой функцией
+    обязательно вызывается load_user_tombstones.
+    """
+    collection = await get_user_collection(db)
+    count = 0
+    cursor = collection.find(
+        {"token_version_changed_at": {"$gt": since}},
+        {"token_version": 1, "token_version_changed_at": 1}
+    )
+    async for user in cursor:
+        revocation_registry.set_version(
+            str(user["_id"]), user["token_version"], to_timestamp(user["token_version_changed_at"])
+        )
+        count += 1
+    return count
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from enum import Enum
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
 
 
 class UserRole(str, Enum):
@@ -28,6 +28,33 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+class UserBatchSelector(BaseModel):
+    """Выбор пользователей для пакетной операции: по списку ID и/или по роли"""
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=10000)
+    role: Optional[UserRole] = None
+    
+    @model_validator(mode="after")
+    def check_not_empty(self) -> "UserBatchSelector":
+        if self.ids is None and self.role is None:
+            raise ValueError("Either ids or role must be specified")
+        return self
+
+
+class UserBatchUpdate(BaseModel):
+    """Пакетное обновление пользователей"""
+    filter: UserBatchSelector
+    update: UserUpdate
+
+
+class UserBatchUpdateResult(BaseModel):
+    matched: int
+    modified: int
+
+
+class UserBatchDeleteResult(BaseModel):
+    deleted: int
+
+
 class UserInDB(UserBase):
     id: str
     role: UserRole
@@ -46,16 +73,93 @@ class User(UserInDB):
     pass
 
 
+class BulkImportRowResult(BaseModel):
+    """Результат импорта одной строки"""
+    row: int
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    """Результат массового импорта пользователей"""
+    total: int
+    created: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    results: List[BulkImportRowResult]
+
+
 class Token(BaseModel):
     """Модель JWT токена"""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
 
 class TokenData(BaseModel):
-    """Данные, хранящиеся в JWT токене"""
+    """Данные, хранящиеся в JWT токене (неизменяемые, разделяются через кэш)"""
     user_id: str
     username: str
     email: str
     role: UserRole
-    expires: datetime 
\ No newline at end of file
+    expires: datetime
+    issued_at: Optional[int] = None
+    jti: Optional[str] = None
+    full_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None 
+    token_version: int = 0
+    session_id: Optional[str] = None
+    
+    model_config = ConfigDict(frozen=True)
+
+
+class SignupsPerDay(BaseModel):
+    date: str
+    count: int
+
+
+class UserStats(BaseModel):
+    """Статистика пользователей"""
+    total: int
+    total_exact: bool
+    by_role: Dict[str, int]
+    active: int
+    inactive: int
+    signups_per_day: List[SignupsPerDay]
+    generated_at: datetime
+
+
+class Session(BaseModel):
+    """Сессия (устройство) пользователя: цепочка refresh токенов"""
+    id: str
+    user_agent: Optional[str] = None
+    ip: Optional[str] = None
+    created_at: datetime
+    last_seen_at: datetime
+    expires_at: datetime
+    current: bool = False
+
+
+class TokenIntrospection(BaseModel):
+    """Результат проверки токена (RFC 7662)"""
+    active: bool
+    sub: Optional[str] = None
+    username: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[UserRole] = None
+    token_type: Optional[str] = None
+    exp: Optional[int] = None
+    iat: Optional[int] = None
+    jti: Optional[str] = None
+
+
+class TokenIntrospectionBatchRequest(BaseModel):
+    """Пакетная проверка токенов"""
+    tokens: List[str] = Field(..., min_length=1)
+
+
+class TokenIntrospectionBatch(BaseModel):
+    results: List[TokenIntrospection]
@@ -1,14 +1,24 @@
-from typing import Annotated
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import time
+from typing import Annotated, Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body, Form
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from app.core.deps import get_database, get_current_user
-from app.core.security import create_access_token
-from app.core.config import settings, get_token_expire_time
-from app.crud.user import authenticate_user, create_user, change_user_password
-from app.models.user import Token, User, UserCreate
+from app.core.config import settings
+from app.core.deps import get_database, get_current_user, get_introspection_client
+from app.core.security import introspect_token
+from app.core.ratelimit import check_login_rate_limit
+from app.crud.audit import record_event
+from app.crud.token import (
+    issue_tokens, rotate_refresh_token, revoke_refresh_token, revoke_token_family, revoke_user_sessions
+)
+from app.crud.user import (
+    authenticate_user, create_user, change_user_password, get_user_by_id, revoke_user_tokens, track_last_login
+)
+from app.models.user import (
+    Token, TokenIntrospection, TokenIntrospectionBatch, TokenIntrospectionBatchRequest, User, UserCreate
+)
 
 router = APIRouter()
 
@@ -24,49 +34,84 @@ async def register(
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
 ):
-    """OAuth2 совместимая авторизация по токену, для получения JWT токена."""
+    """OAuth2 совместимая авторизация, выдает JWT токен доступа и refresh токен."""
+    client_ip = request.client.host if request.client else None
+    # Ограничение частоты попыток до проверки пароля
+    await check_login_rate_limit(client_ip, form_data.username)
+    
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        record_event("login_failed", username=form_data.username, ip=client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    token_expires = get_token_expire_time()
-    access_token = create_access_token(
-        data={
-            "sub": user["id"],
-            "username": user["username"],
-            "email": user["email"],
-            "role": user["role"]
-        },
-        expires_delta=token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Время входа и журнал записываются в фоне пачками
+    track_last_login(user["id"])
+    record_event("login", user_id=user["id"], ip=client_ip)
+    device = {"user_agent": request.headers.get("user-agent"), "ip": client_ip}
+    return await issue_tokens(db, user, device=device)
 
 
 @router.post("/refresh-token", response_model=Token)
 async def refresh_token(
-    current_user: Annotated[User, Depends(get_current_user)]
+    refresh_token: Annotated[str, Body(..., embed=True)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
 ):
-    """Обновление JWT токена."""
-    token_expires = get_token_expire_time()
-    access_token = create_access_token(
-        data={
-            "sub": current_user["id"],
-            "username": current_user["username"],
-            "email": current_user["email"],
-            "role": current_user["role"]
-        },
-        expires_delta=token_expires
-    )
+    """
+    Обновление токенов по refresh токену с ротацией.
+    Каждый refresh токен одноразовый: повторное использование отзывает всю цепочку.
+    """
+    record = await rotate_refresh_token(db, refresh_token)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Claims нового токена берутся из актуальных данных пользователя
+    user = await get_user_by_id(db, record["user_id"])
+    if not user or not user.get("is_active", False):
+        await revoke_token_family(db, record["family_id"])
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return await issue_tokens(db, user, family_id=record["family_id"])
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    refresh_token: Annotated[str, Body(..., embed=True)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """Выход из сессии: отзыв refresh токена и выданных по нему токенов доступа."""
+    await revoke_refresh_token(db, refresh_token)
+    return None
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """
+    Выход на всех устройствах: все токены доступа отзываются увеличением
+    версии токенов пользователя, refresh токены и сессии удаляются.
+    """
+    await revoke_user_tokens(db, current_user["id"])
+    await revoke_user_sessions(db, current_user["id"])
+    record_event("logout_all", user_id=current_user["id"])
+    return None
 
 
 @router.post("/change-password", status_code=status.HTTP_200_OK)
@@ -90,4 +135,57 @@ async def change_password(
             detail="Current password is incorrect"
         )
     
-    return {"message": "Password changed successfully"} 
\ No newline at end of file
+    # Токены доступа отозваны версией, refresh токены всех устройств удаляются
+    await revoke_user_sessions(db, current_user["id"])
+    record_event("password_changed", user_id=current_user["id"])
+    return {"message": "Password changed successfully"} 
+
+
+def _introspection_headers(results: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Заголовки кэширования ответа introspection: ответ можно переиспользовать
+    не дольше INTROSPECTION_CACHE_MAX_AGE_SECONDS и не дольше срока действия токенов.
+    Неактивный токен активным уже не станет, поэтому ограничивается только настройкой.
+    """
+    now = int(time.time())
+    max_age = settings.INTROSPECTION_CACHE_MAX_AGE_SECONDS
+    for result in results:
+        if result["active"]:
+            max_age = min(max_age, max(0, result["exp"] - now))
+    return {
+        "Cache-Control": f"private, max-age={max_age}",
+        "Vary": "Authorization",
+    }
+
+
+@router.post("/introspect", response_model=TokenIntrospection, response_model_exclude_none=True)
+async def introspect(
+    token: Annotated[str, Form()],
+    client_id: Annotated[str, Depends(get_introspection_client)],
+    token_type_hint: Annotated[Optional[str], Form()] = None
+):
+    """
+    Проверка токена доступа для других сервисов (RFC 7662).
+    Клиент аутентифицируется через HTTP Basic (INTROSPECTION_CLIENTS).
+    Refresh токены не проверяются и всегда считаются неактивными.
+    """
+    result = introspect_token(token)
+    return ORJSONResponse(result, headers=_introspection_headers([result]))
+
+
+@router.post("/introspect/batch", response_model=TokenIntrospectionBatch, response_model_exclude_none=True)
+async def introspect_batch(
+    batch: Annotated[TokenIntrospectionBatchRequest, Body(...)],
+    client_id: Annotated[str, Depends(get_introspection_client)]
+):
+    """
+    Пакетная проверка токенов доступа: результаты в порядке переданных токенов.
+    """
+    if len(batch.tokens) > settings.INTROSPECTION_BATCH_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.INTROSPECTION_BATCH_MAX_TOKENS} tokens per request"
+        )
+    
+    results = [introspect_token(token) for token in batch.tokens]
+    return ORJSONResponse({"results": results}, headers=_introspection_headers(results))
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Annotated
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.core.database import pool_monitor
+from app.core.deps import get_database
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz():
+    """Проверка живости процесса (не обращается к зависимостям)."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz(
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """
+    Проверка готовности принимать трафик: доступность MongoDB
+    и загрузка пулов соединений.
+    """
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=settings.READINESS_TIMEOUT_SECONDS)
+        mongodb_ok = True
+    except Exception:
+        mongodb_ok = False
+
+    pools = pool_monitor.stats()
+    content = {
+        "status": "ok" if mongodb_ok else "unavailable",
+        "mongodb": {
+            "reachable": mongodb_ok,
+            "pools": pools,
+            "saturated": any(pool["in_use"] >= pool["max_size"] for pool in pools.values()),
+        },
+    }
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if mongodb_ok else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=content
+    )
@@ -0,0 +1,37 @@
+from typing import Annotated, Any, Dict
+from fastapi import APIRouter, Depends
+
+from app.core.cache import negative_cache, principal_cache, token_cache, user_stats_cache
+from app.core.database import pool_monitor
+from app.core.deps import get_current_admin_user
+from app.core.hashing import hashing_pool
+from app.core.revocation import revocation_registry
+from app.core.scheduler import scheduler
+from app.core.watcher import user_change_watcher
+from app.crud.user import principal_flight, user_stats_flight
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def read_system_stats(
+    current_user: Annotated[User, Depends(get_current_admin_user)]
+) -> Dict[str, Any]:
+    """
+    Внутренняя статистика процесса (пул хеширования, кэши и т.д.).
+    Только для администраторов.
+    """
+    return {
+        "hashing_pool": hashing_pool.stats(),
+        "principal_cache": principal_cache.stats(),
+        "principal_flight": principal_flight.stats(),
+        "token_cache": token_cache.stats(),
+        "negative_cache": negative_cache.stats(),
+        "user_stats_cache": user_stats_cache.stats(),
+        "user_stats_flight": user_stats_flight.stats(),
+        "mongodb_pools": pool_monitor.stats(),
+        "scheduler": scheduler.stats(),
+        "revocation": revocation_registry.stats(),
+        "user_change_watcher": user_change_watcher.stats(),
+    }
@@ -1,20 +1,36 @@
-from typing import Annotated, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status, Body
+from datetime import datetime
+from typing import Annotated, AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status, Body
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from app.core.deps import get_database, get_current_user, get_current_admin_user
-from app.crud.user import get_user_by_id, get_users, update_user, delete_user
-from app.models.user import User, UserUpdate, UserRole
+from app.core.config import settings
+from app.core.bulk_import import import_users, iter_lines, parse_csv, parse_ndjson
+from app.core.deps import get_database, get_read_database, get_current_user, get_current_admin_user, oauth2_scheme
+from app.core.security import decode_token
+from app.core.serialization import dumps_ndjson, user_response, users_response
+from app.crud.token import get_sessions_page, revoke_session
+from app.crud.user import (
+    USER_PUBLIC_FIELDS, get_user_by_id, get_users, get_users_page, iter_users, update_user, delete_user,
+    update_users_batch, delete_users_batch, build_search_filter, search_users, get_user_stats
+)
+from app.models.user import (
+    BulkImportResult, User, UserUpdate, UserRole, UserBatchSelector, UserBatchUpdate,
+    UserBatchUpdateResult, UserBatchDeleteResult, Session, UserStats
+)
 
 router = APIRouter()
 
+# Количество записей в одной пачке при потоковой выгрузке
+EXPORT_BATCH_SIZE = 1000
+
 
 @router.get("/me", response_model=User)
 async def read_users_me(
     current_user: Annotated[User, Depends(get_current_user)]
 ):
     """Получение информации о текущем пользователе."""
-    return current_user
+    return user_response(current_user)
 
 
 @router.put("/me", response_model=User)
@@ -40,26 +56,213 @@ async def update_user_me(
     return updated_user
 
 
+@router.get("/me/sessions", response_model=List[Session])
+async def read_my_sessions(
+    request: Request,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    cursor: Annotated[Optional[str], Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
+):
+    """
+    Активные сессии (устройства) текущего пользователя, новые первыми.
+    Курсор следующей страницы возвращается в заголовках X-Next-Cursor и Link.
+    """
+    sessions, next_cursor = await get_sessions_page(db, current_user["id"], limit, cursor)
+    current_session = decode_token(token).session_id
+    for session in sessions:
+        session["current"] = session["id"] == current_session
+    
+    headers = {}
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return ORJSONResponse(sessions, headers=headers)
+
+
+@router.delete("/me/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_my_session(
+    session_id: Annotated[str, Path(...)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """Завершение сессии на одном устройстве: refresh токены и выданные по ним токены доступа отзываются."""
+    if not await revoke_session(db, current_user["id"], session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    return None
+
+
 @router.get("", response_model=List[User])
 async def read_users(
-    skip: Annotated[int, Query(0, ge=0)] = 0,
-    limit: Annotated[int, Query(100, ge=1, le=100)] = 100,
-    role: Annotated[Optional[UserRole], Query(None)] = None,
+    request: Request,
     current_user: Annotated[User, Depends(get_current_admin_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_read_database)],
+    cursor: Annotated[Optional[str], Query()] = None,
+    skip: Annotated[int, Query(ge=0, deprecated=True)] = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100,
+    role: Annotated[Optional[UserRole], Query()] = None
 ):
     """
     Получение списка пользователей.
     Только для администраторов.
+    
+    Постраничный вывод по курсору: курсор следующей страницы возвращается
+    в заголовках X-Next-Cursor и Link. Параметр skip оставлен для совместимости.
+    """
+    if skip:
+        return users_response(await get_users(db, skip, limit, role))
+    
+    users, next_cursor = await get_users_page(db, limit, role, cursor)
+    headers = {}
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return users_response(users, headers)
+
+
+@router.get("/stats", response_model=UserStats)
+async def read_user_stats(
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_read_database)],
+    days: Annotated[int, Query(ge=1, le=365)] = 30,
+    exact: Annotated[bool, Query()] = False
+):
+    """
+    Статистика пользователей: по ролям, активные/неактивные, регистрации по дням.
+    Результат кэшируется на USER_STATS_CACHE_TTL_SECONDS.
+    exact=true - точное общее количество вместо оценки по метаданным коллекции.
+    Только для администраторов.
+    """
+    stats = await get_user_stats(db, days, exact)
+    return ORJSONResponse(
+        stats,
+        headers={"Cache-Control": f"private, max-age={settings.USER_STATS_CACHE_TTL_SECONDS}"}
+    )
+
+
+@router.get("/search", response_model=List[User])
+async def search_users_admin(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_read_database)],
+    q: Annotated[Optional[str], Query(min_length=1, max_length=100)] = None,
+    username: Annotated[Optional[str], Query(min_length=1, max_length=50)] = None,
+    email: Annotated[Optional[str], Query(min_length=1, max_length=254)] = None,
+    full_name: Annotated[Optional[str], Query(min_length=1, max_length=100)] = None,
+    role: Annotated[Optional[UserRole], Query()] = None,
+    is_active: Annotated[Optional[bool], Query()] = None,
+    created_from: Annotated[Optional[datetime], Query()] = None,
+    created_to: Annotated[Optional[datetime], Query()] = None,
+    cursor: Annotated[Optional[str], Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 100
+):
+    """
+    Поиск пользователей. Только для администраторов.
+    
+    q, username, email, full_name - поиск по префиксу без учета регистра
+    (q - по любому из трех полей), created_from/created_to - диапазон даты создания.
+    Курсор следующей страницы возвращается в заголовках X-Next-Cursor и Link.
     """
-    return await get_users(db, skip, limit, role)
+    filter_query = build_search_filter(
+        q, username, email, full_name, role, is_active, created_from, created_to
+    )
+    users, next_cursor = await search_users(db, filter_query, limit, cursor)
+    headers = {}
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return users_response(users, headers)
+
+
+@router.get("/export")
+async def export_users(
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_read_database)],
+    role: Annotated[Optional[UserRole], Query()] = None
+):
+    """
+    Потоковая выгрузка всех пользователей в формате NDJSON.
+    Только для администраторов.
+    """
+    async def generate() -> AsyncIterator[bytes]:
+        batch = []
+        async for user in iter_users(db, role, fields=USER_PUBLIC_FIELDS, batch_size=EXPORT_BATCH_SIZE):
+            batch.append(user)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield dumps_ndjson(batch)
+                batch = []
+        if batch:
+            yield dumps_ndjson(batch)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
+
+
+@router.post("/import", response_model=BulkImportResult)
+async def import_users_bulk(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    chunk_size: Annotated[int, Query(ge=1, le=10000)] = 1000
+):
+    """
+    Массовый импорт пользователей из NDJSON (application/x-ndjson)
+    или CSV (text/csv) в теле запроса. Тело читается потоком.
+    Только для администраторов.
+    """
+    lines = iter_lines(request.stream())
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = parse_csv(lines)
+    else:
+        rows = parse_ndjson(lines)
+    return await import_users(db, rows, chunk_size)
+
+
+@router.post("/batch/update", response_model=UserBatchUpdateResult)
+async def update_users_batch_admin(
+    batch: Annotated[UserBatchUpdate, Body(...)],
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """
+    Пакетное обновление пользователей (например, деактивация) по списку ID или роли.
+    Текущий администратор не изменяется (нельзя деактивировать себя или снять свою роль).
+    Только для администраторов.
+    """
+    return await update_users_batch(
+        db, batch.update, batch.filter.ids, batch.filter.role, exclude_id=current_user["id"]
+    )
+
+
+@router.post("/batch/delete", response_model=UserBatchDeleteResult)
+async def delete_users_batch_admin(
+    selector: Annotated[UserBatchSelector, Body(...)],
+    current_user: Annotated[User, Depends(get_current_admin_user)],
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+):
+    """
+    Пакетное удаление пользователей по списку ID или роли.
+    Текущий администратор не удаляется.
+    Только для администраторов.
+    """
+    return await delete_users_batch(db, selector.ids, selector.role, exclude_id=current_user["id"])
 
 
 @router.get("/{user_id}", response_model=User)
 async def read_user(
     user_id: Annotated[str, Path(...)],
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncIOMotorDatabase, Depends(get_read_database)]
 ):
     """
     Получение информации о пользователе по ID.
@@ -79,7 +282,7 @@ async def read_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with ID {user_id} not found"
         )
-    return user
+    return user_response(user)
 
 
 @router.put("/{user_id}", response_model=User)
@@ -0,0 +1,26 @@
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, Response
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.keys import key_ring
+
+router = APIRouter()
+
+
+@router.get("/jwks.json")
+async def read_jwks(
+    if_none_match: Annotated[Optional[str], Header()] = None
+):
+    """
+    Открытые ключи для проверки JWT в формате JWKS.
+    Ответ кэшируется клиентами и прокси (Cache-Control + ETag).
+    """
+    jwks, etag = key_ring.jwks()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}",
+        "ETag": etag,
+    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jwks, headers=headers)
@@ -0,0 +1,125 @@
+"""
+Общие функции бенчмарков: выбор хранилища (MongoDB или mongomock-motor),
+расчет перцентилей и сохранение результатов в JSON для сравнения между коммитами.
+"""
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BACKENDS = ("mongodb", "mongomock")
+
+
+def use_backend(backend: str) -> None:
+    """
+    Подмена клиента MongoDB в lifespan приложения.
+    mongomock - хранилище в памяти процесса (mongomock-motor), не требует mongod;
+    задержки сети и диска в результатах при этом отсутствуют.
+    """
+    if backend == "mongodb":
+        return
+
+    from mongomock_motor import AsyncMongoMockClient
+
+    import main
+    from app.core.watcher import user_change_watcher
+    main.create_mongo_client = AsyncMongoMockClient
+    # Change streams в mongomock не поддерживаются
+    user_change_watcher.mode = "polling"
+
+
+def make_tokens(count: int) -> List[str]:
+    """Токены доступа разных пользователей со всеми claims stateless-режима."""
+    from app.core.security import create_access_token
+
+    now = int(time.time())
+    return [
+        create_access_token({
+            "sub": f"{i:024x}",
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "role": "user",
+            "full_name": f"User {i}",
+            "created_at": now,
+            "updated_at": now,
+        })
+        for i in range(count)
+    ]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга (samples должны быть отсортированы)."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Сводка по длительностям операций (в секундах): p50/p90/p99, среднее и RPS."""
+    samples = sorted(latencies)
+    count = len(samples)
+    return {
+        "count": count,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(samples) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def measure(func, iterations: int) -> Dict[str, Any]:
+    """Замер синхронной функции: длительность каждого вызова."""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def measure_async(func, iterations: int) -> Dict[str, Any]:
+    """Замер асинхронной функции: длительность каждого вызова."""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        await func(i)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(**params: Any) -> Dict[str, Any]:
+    """Описание запуска: коммит, версия Python, параметры бенчмарка."""
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **params,
+    }
+
+
+def write_results(results: Dict[str, Any], output: Optional[str]) -> None:
+    """Вывод результатов в stdout и, если указано, в файл."""
+    content = json.dumps(results, indent=2, ensure_ascii=False)
+    print(content)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(content + "\n")
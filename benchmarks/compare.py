@@ -0,0 +1,60 @@
+"""
+Сравнение двух JSON результатов бенчмарков (load_test или micro):
+изменение p50/p99 и RPS по каждой операции.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+METRICS = ("p50_ms", "p99_ms", "rps")
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Операции с метриками из вложенных групп результатов."""
+    for name, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        key = f"{prefix}{name}"
+        if "p50_ms" in value:
+            yield key, value
+            yield from _flatten(value.get("by_scenario", {}), f"{key}.")
+        else:
+            yield from _flatten(value, f"{key}.")
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(before_path: str, after_path: str) -> None:
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"before: {before['environment'].get('commit')}  after: {after['environment'].get('commit')}")
+    before_ops = dict(_flatten(before["results"]))
+    header = f"{'operation':<40}" + "".join(f"{metric:>24}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for name, after_values in _flatten(after["results"]):
+        before_values = before_ops.get(name)
+        if before_values is None:
+            continue
+        cells = "".join(
+            f"{before_values[metric]:>9} -> {after_values[metric]:<7}{_delta(before_values[metric], after_values[metric]):>7}"
+            for metric in METRICS
+        )
+        print(f"{name:<40}{cells}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    main(args.before, args.after)
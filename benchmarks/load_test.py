@@ -0,0 +1,230 @@
+"""
+Нагрузочный тест API в процессе (httpx + ASGITransport, без сети):
+вход, регистрация, /api/users/me, список пользователей, обновление токенов
+и смешанная нагрузка. Результат - p50/p99 и RPS по сценариям в JSON.
+
+    python -m benchmarks.load_test --backend mongomock --requests 2000 --concurrency 20
+    python -m benchmarks.load_test --backend mongodb --scenarios me,mixed --output before.json
+
+Сравнение двух запусков: python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.common import BACKENDS, environment, summarize, use_backend, write_results
+
+PASSWORD = "benchmark-password"
+
+# Доли запросов в смешанной нагрузке: в основном авторизованное чтение
+MIXED_WEIGHTS = {
+    "me": 70,
+    "list": 10,
+    "refresh": 10,
+    "login": 8,
+    "register": 2,
+}
+
+
+class WorkerState:
+    """Учетные данные одного виртуального клиента (своя цепочка refresh токенов)."""
+
+    def __init__(self, username: str, tokens: Dict[str, str]) -> None:
+        self.username = username
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens["refresh_token"]
+
+    def update(self, tokens: Dict[str, str]) -> None:
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens["refresh_token"]
+
+
+class Context:
+    def __init__(self, client: httpx.AsyncClient, admin_token: str, prefix: str) -> None:
+        self.client = client
+        self.admin_token = admin_token
+        self.prefix = prefix
+        self.registered = 0
+
+
+async def _register(client: httpx.AsyncClient, username: str) -> None:
+    response = await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+
+
+async def _login(client: httpx.AsyncClient, username: str) -> Dict[str, str]:
+    response = await client.post("/api/auth/login", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()
+
+
+async def scenario_login(ctx: Context, state: WorkerState) -> httpx.Response:
+    response = await ctx.client.post(
+        "/api/auth/login", data={"username": state.username, "password": PASSWORD}
+    )
+    if response.status_code == 200:
+        state.update(response.json())
+    return response
+
+
+async def scenario_register(ctx: Context, state: WorkerState) -> httpx.Response:
+    ctx.registered += 1
+    username = f"{ctx.prefix}_new_{ctx.registered}"
+    return await ctx.client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+    })
+
+
+async def scenario_me(ctx: Context, state: WorkerState) -> httpx.Response:
+    return await ctx.client.get(
+        "/api/users/me", headers={"Authorization": f"Bearer {state.access_token}"}
+    )
+
+
+async def scenario_list(ctx: Context, state: WorkerState) -> httpx.Response:
+    return await ctx.client.get(
+        "/api/users", params={"limit": 50}, headers={"Authorization": f"Bearer {ctx.admin_token}"}
+    )
+
+
+async def scenario_refresh(ctx: Context, state: WorkerState) -> httpx.Response:
+    response = await ctx.client.post(
+        "/api/auth/refresh-token", json={"refresh_token": state.refresh_token}
+    )
+    if response.status_code == 200:
+        state.update(response.json())
+    return response
+
+
+Scenario = Callable[[Context, WorkerState], Awaitable[httpx.Response]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login": scenario_login,
+    "register": scenario_register,
+    "me": scenario_me,
+    "list": scenario_list,
+    "refresh": scenario_refresh,
+}
+
+
+def _mixed_picker(rng: random.Random) -> Callable[[], str]:
+    names = list(MIXED_WEIGHTS)
+    weights = list(MIXED_WEIGHTS.values())
+    return lambda: rng.choices(names, weights)[0]
+
+
+async def run_scenario(
+    ctx: Context,
+    states: List[WorkerState],
+    name: str,
+    total: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Выполнение сценария: total запросов, по одному worker на каждое состояние."""
+    remaining = iter(range(total))
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    rng = random.Random(seed)
+    pick = _mixed_picker(rng) if name == "mixed" else (lambda: name)
+
+    async def worker(state: WorkerState) -> None:
+        for _ in remaining:
+            scenario = pick()
+            started = time.perf_counter()
+            response = await SCENARIOS[scenario](ctx, state)
+            latencies.setdefault(scenario, []).append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[scenario] = errors.get(scenario, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(state) for state in states))
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    result = summarize(all_latencies, elapsed, sum(errors.values()))
+    if name == "mixed":
+        result["by_scenario"] = {
+            scenario: summarize(values, elapsed, errors.get(scenario, 0))
+            for scenario, values in sorted(latencies.items())
+        }
+    return result
+
+
+async def _prepare(client: httpx.AsyncClient, app: Any, prefix: str) -> Context:
+    """Создание администратора для сценария списка пользователей."""
+    from app.crud.user import get_user_by_username, update_user
+    from app.models.user import UserRole, UserUpdate
+
+    admin = f"{prefix}_admin"
+    await _register(client, admin)
+    user = await get_user_by_username(app.state.mongodb, admin)
+    await update_user(app.state.mongodb, user["id"], UserUpdate(role=UserRole.ADMIN))
+    admin_tokens = await _login(client, admin)
+    return Context(client, admin_tokens["access_token"], prefix)
+
+
+async def main(args: argparse.Namespace) -> None:
+    use_backend(args.backend)
+
+    from app.core.config import settings
+    from main import app
+
+    if not args.keep_rate_limit:
+        # Все запросы идут с одного адреса и быстро уперлись бы в лимит входа
+        settings.RATE_LIMIT_ENABLED = False
+
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            ctx = await _prepare(client, app, prefix)
+            states = []
+            for i in range(args.concurrency):
+                username = f"{prefix}_{i}"
+                await _register(client, username)
+                states.append(WorkerState(username, await _login(client, username)))
+
+            for index, name in enumerate(args.scenarios):
+                results[name] = await run_scenario(ctx, states, name, args.requests, args.seed + index)
+
+    write_results({
+        "benchmark": "load_test",
+        "environment": environment(
+            backend=args.backend,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            auth_stateless=settings.AUTH_STATELESS,
+            password_hash_schemes=settings.PASSWORD_HASH_SCHEMES,
+        ),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="mongodb")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","),
+                        default=["login", "register", "me", "list", "refresh", "mixed"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-rate-limit", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS) - {"mixed"}
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
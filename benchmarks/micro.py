@@ -0,0 +1,145 @@
+"""
+Микробенчмарки: create_access_token, decode_token (с кэшем и без),
+сериализация списка пользователей и CRUD функции пользователей. Результат - p50/p99 и операций в секунду в JSON.
+
+    python -m benchmarks.micro --backend mongomock --iterations 5000
+    python -m benchmarks.micro --backend mongodb --output micro.json
+"""
+import argparse
+import asyncio
+import uuid
+from typing import Any, Dict
+
+from benchmarks.common import BACKENDS, environment, make_tokens, measure, measure_async, use_backend, write_results
+
+PASSWORD = "benchmark-password"
+
+
+def bench_tokens(iterations: int, token_count: int) -> Dict[str, Any]:
+    from app.core.cache import token_cache
+    from app.core.security import create_access_token, decode_token
+
+    tokens = make_tokens(token_count)
+    claims = {"sub": "0" * 24, "username": "bench", "email": "bench@example.com", "role": "user"}
+    results = {"create_access_token": measure(lambda i: create_access_token(claims), iterations)}
+
+    cache_size = token_cache.maxsize
+    token_cache.maxsize = 0
+    token_cache.clear()
+    results["decode_token_uncached"] = measure(lambda i: decode_token(tokens[i % token_count]), iterations)
+    token_cache.maxsize = cache_size
+    results["decode_token_cached"] = measure(lambda i: decode_token(tokens[i % token_count]), iterations)
+    return results
+
+
+def bench_serialization(iterations: int, page_size: int) -> Dict[str, Any]:
+    """Страница списка пользователей: валидация User + json против serialize_user + orjson."""
+    import json
+    from datetime import datetime
+    from typing import List
+
+    import orjson
+    from pydantic import TypeAdapter
+
+    from app.core.serialization import serialize_user
+    from app.models.user import User
+
+    now = datetime.utcnow()
+    page = [
+        {
+            "id": f"{i:024x}",
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "full_name": f"User {i}",
+            "role": "user",
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(page_size)
+    ]
+    adapter = TypeAdapter(List[User])
+    iterations = max(1, iterations // 10)
+    return {
+        "response_model_json": measure(
+            lambda i: json.dumps(adapter.dump_python(adapter.validate_python(page), mode="json")),
+            iterations
+        ),
+        "serialize_user_orjson": measure(
+            lambda i: orjson.dumps([serialize_user(user) for user in page]), iterations
+        ),
+    }
+
+
+async def bench_crud(db: Any, iterations: int, user_count: int) -> Dict[str, Any]:
+    from app.core.security import get_password_hashes
+    from app.crud.user import (
+        bulk_create_users, get_user_by_email, get_user_by_id, get_user_by_username, get_users_page, update_user
+    )
+    from app.models.user import UserCreate, UserUpdate
+
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+    users = [
+        UserCreate(username=f"{prefix}_{i}", email=f"{prefix}_{i}@example.com", password=PASSWORD)
+        for i in range(user_count)
+    ]
+    created = await bulk_create_users(db, users)
+    ids = [result["id"] for result in created if "id" in result]
+    usernames = [user.username for user in users]
+
+    results = {
+        "get_user_by_id": await measure_async(lambda i: get_user_by_id(db, ids[i % len(ids)]), iterations),
+        "get_user_by_username": await measure_async(
+            lambda i: get_user_by_username(db, usernames[i % len(usernames)]), iterations
+        ),
+        "get_user_by_email": await measure_async(
+            lambda i: get_user_by_email(db, users[i % len(users)].email), iterations
+        ),
+        "get_users_page": await measure_async(lambda i: get_users_page(db, limit=50), iterations),
+        "update_user": await measure_async(
+            lambda i: update_user(db, ids[i % len(ids)], UserUpdate(full_name=f"Bench {i}")), iterations
+        ),
+    }
+    # Хеширование заметно дороже остальных операций, поэтому замеряется на меньшей выборке
+    results["get_password_hashes_x10"] = await measure_async(
+        lambda i: get_password_hashes([PASSWORD] * 10), max(1, iterations // 500)
+    )
+
+    await db.users.delete_many({"username": {"$regex": f"^{prefix}_"}})
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    use_backend(args.backend)
+
+    from main import app
+
+    results = {
+        "tokens": bench_tokens(args.iterations, args.tokens),
+        "serialization": bench_serialization(args.iterations, args.page_size),
+    }
+    async with app.router.lifespan_context(app):
+        results["crud"] = await bench_crud(app.state.mongodb, args.iterations, args.users)
+
+    write_results({
+        "benchmark": "micro",
+        "environment": environment(
+            backend=args.backend,
+            iterations=args.iterations,
+            tokens=args.tokens,
+            users=args.users,
+            page_size=args.page_size,
+        ),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="mongodb")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Сравнение GET /api/users/me в разных режимах авторизации:
+
+- db        - пользователь читается из хранилища на каждый запрос (кэш отключен)
+- cached    - пользователь берется из кэша get_current_user
+- stateless - пользователь восстанавливается из claims токена (AUTH_STATELESS=True)
+
+Результат - p50/p99 и RPS по режимам в JSON.
+
+    python -m benchmarks.stateless_auth --backend mongomock --requests 5000 --concurrency 50
+    python -m benchmarks.stateless_auth --backend mongodb --output stateless.json
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import BACKENDS, environment, summarize, use_backend, write_results
+
+PASSWORD = "benchmark-password"
+
+
+async def _prepare_token(client: httpx.AsyncClient) -> str:
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    response = await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+    response = await client.post("/api/auth/login", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _run_mode(client: httpx.AsyncClient, token: str, total: int, concurrency: int) -> Dict[str, Any]:
+    headers = {"Authorization": f"Bearer {token}"}
+    remaining = iter(range(total))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get("/api/users/me", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def main(args: argparse.Namespace) -> None:
+    use_backend(args.backend)
+
+    from app.core.cache import principal_cache
+    from app.core.config import settings
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            token = await _prepare_token(client)
+            cache_size = principal_cache.maxsize
+
+            settings.AUTH_STATELESS = False
+            principal_cache.maxsize = 0
+            principal_cache.clear()
+            results["db"] = await _run_mode(client, token, args.requests, args.concurrency)
+
+            principal_cache.maxsize = cache_size
+            results["cached"] = await _run_mode(client, token, args.requests, args.concurrency)
+
+            settings.AUTH_STATELESS = True
+            results["stateless"] = await _run_mode(client, token, args.requests, args.concurrency)
+
+    write_results({
+        "benchmark": "stateless_auth",
+        "environment": environment(
+            backend=args.backend,
+            requests=args.requests,
+            concurrency=args.concurrency,
+        ),
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="mongodb")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
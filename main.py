@@ -1,19 +1,81 @@
-import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.routes.auth import router as auth_router
 from app.routes.users import router as users_router
+from app.routes.system import router as system_router
+from app.routes.well_known import router as well_known_router
+from app.routes.health import router as health_router
+from app.routes.metrics import router as metrics_router
+from app.core.config import settings
+from app.core.database import create_mongo_client, read_database_from_client
+from app.core.hashing import hashing_pool
+from app.core.indexes import ensure_indexes
+from app.core.keys import key_ring
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.ratelimit import rate_limit_backend
+from app.core.scheduler import scheduler
+from app.core.watcher import user_change_watcher
+from app.core.security import get_dummy_password_hash
+from app.crud.token import load_revoked_tokens, purge_expired_sessions
+from app.crud.user import load_token_versions, load_user_tombstones
 
 # Загрузка переменных окружения
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация и освобождение ресурсов приложения."""
+    app.state.mongodb_client = create_mongo_client()
+    app.state.mongodb = app.state.mongodb_client[settings.MONGODB_DB_NAME]
+    app.state.mongodb_read = read_database_from_client(app.state.mongodb_client)
+    db = app.state.mongodb
+    
+    # Ключи подписи разбираются один раз при старте
+    key_ring.load()
+    # Фиктивный хеш для входа несуществующих пользователей
+    await get_dummy_password_hash()
+    
+    # Индексы объявлены в app/core/indexes.py; при старте создаются только недостающие
+    await ensure_indexes(db)
+    
+    # Отозванные jti, недавно измененные версии токенов и удаленные пользователи
+    # (за время жизни токена доступа)
+    await load_revoked_tokens(db)
+    tokens_issued_since = datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    await load_token_versions(db, tokens_issued_since)
+    await load_user_tombstones(db, tokens_issued_since)
+    
+    # Счетчики ограничения попыток входа (для RATE_LIMIT_BACKEND=mongodb)
+    await rate_limit_backend.start(db)
+    
+    # Фоновые задачи и отложенные записи
+    scheduler.every("purge_expired_sessions", settings.SESSION_PURGE_INTERVAL_SECONDS, purge_expired_sessions)
+    await scheduler.start(db)
+    # Сброс локальных кэшей по изменениям пользователей из других процессов
+    await user_change_watcher.start(db)
+    
+    yield
+    
+    # Доработка принятых задач до закрытия соединения с БД
+    await user_change_watcher.stop()
+    await scheduler.stop()
+    app.state.mongodb_client.close()
+    hashing_pool.shutdown()
+    mark_process_dead()
+
+
 app = FastAPI(
     title="Auth API",
     description="OAuth2 и JWT аутентификация с MongoDB",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -24,23 +86,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("startup")
-async def startup_db_client():
-    app.mongodb_client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
-    app.mongodb = app.mongodb_client[os.getenv("MONGODB_DB_NAME")]
-    
-    # Создание индексов для пользователей
-    await app.mongodb.users.create_index("email", unique=True)
-    await app.mongodb.users.create_index("username", unique=True)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    app.mongodb_client.close()
+# Гистограммы длительности запросов по маршрутам
+app.add_middleware(MetricsMiddleware)
 
 # Подключение роутеров
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(users_router, prefix="/api/users", tags=["users"])
+app.include_router(system_router, prefix="/api/system", tags=["system"])
+app.include_router(well_known_router, prefix="/.well-known", tags=["well-known"])
+app.include_router(health_router, tags=["health"])
+app.include_router(metrics_router, tags=["metrics"])
 
 @app.get("/")
 async def root():